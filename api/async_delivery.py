@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import os
+import time
+
+from api.metrics import SMTP_CONNECT_SECONDS, SMTP_LOGIN_SECONDS, SMTP_SEND_SECONDS, SMTP_ERRORS
+
+logger = logging.getLogger(__name__)
+
+try:
+    import aiosmtplib
+except ImportError:
+    aiosmtplib = None  # async backend unavailable, callers fall back to threads
+
+def async_backend_available():
+    return aiosmtplib is not None
+
+class AsyncDeliveryEngine:
+    """Drives many SMTP sessions concurrently from one event loop
+
+    Concurrency is bounded by max_concurrency; work is fed through a bounded
+    queue so producers wait (backpressure) instead of piling up tasks.
+    Outcome callbacks may block (they write to MongoDB), so they run in
+    worker threads rather than on the loop.
+
+    SMTP only: SendGrid reminders already go out 1000 recipients per request
+    over kept-alive connections (send_reminder_items_sendgrid), so an async
+    HTTP path is out of scope.
+    """
+
+    def __init__(self, max_concurrency=200, timeout=30, use_tls=True, queue_size=None):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.use_tls = use_tls
+        self.queue_size = queue_size or max_concurrency * 2
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_concurrency=int(os.environ.get('ASYNC_DELIVERY_CONCURRENCY', '200')),
+            timeout=float(os.environ.get('SMTP_TIMEOUT', '30')),
+            use_tls=os.environ.get('SMTP_USE_TLS', 'true').lower() in ['true', '1', 't'],
+        )
+
+    async def _run(self, items, worker):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+
+        async def consume():
+            while True:
+                item = await queue.get()
+                try:
+                    if item is None:
+                        return
+                    await worker(item)
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(consume()) for _ in range(min(self.max_concurrency, max(1, len(items))))]
+        for item in items:
+            await queue.put(item)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+
+    # SMTP
+
+    async def _send_smtp_batch(self, batch):
+        """batch: dict with server, port, username, password, messages [(from, to, text, on_result)]
+        and an optional before_send coroutine function"""
+        messages = list(batch['messages'])
+        while messages:
+            sent_on_session = 0
+            smtp = aiosmtplib.SMTP(
+                hostname=batch['server'], port=batch['port'], timeout=self.timeout, start_tls=self.use_tls
+            )
+            stage = 'connect'
+            try:
+                start = time.perf_counter()
+                await smtp.connect()
+                SMTP_CONNECT_SECONDS.observe(time.perf_counter() - start, backend='async')
+                stage = 'login'
+                start = time.perf_counter()
+                await smtp.login(batch['username'], batch['password'])
+                SMTP_LOGIN_SECONDS.observe(time.perf_counter() - start, backend='async')
+                stage = 'send'
+                while messages:
+                    if batch.get('before_send'):
+                        await batch['before_send']()
+                    from_addr, to_addr, text, on_result = messages[0]
+                    error = None
+                    start = time.perf_counter()
+                    try:
+                        await asyncio.wait_for(smtp.sendmail(from_addr, to_addr, text), self.timeout)
+                        SMTP_SEND_SECONDS.observe(time.perf_counter() - start, backend='async')
+                    except (aiosmtplib.SMTPRecipientsRefused, aiosmtplib.SMTPSenderRefused,
+                            aiosmtplib.SMTPDataError) as e:
+                        logger.warning("❌ Error sending email to %s: %s", to_addr, e, extra={'sampled': True})
+                        SMTP_ERRORS.inc(backend='async', stage='send')
+                        error = e
+                    messages.pop(0)
+                    sent_on_session += 1
+                    await asyncio.to_thread(on_result, error is None, error)
+            except Exception as e:
+                logger.error("❌ SMTP session for %s failed: %s", batch['username'], e)
+                SMTP_ERRORS.inc(backend='async', stage=stage)
+                # Reconnect if the dropped session made progress; otherwise give up on the rest
+                if sent_on_session and messages:
+                    continue
+                for message in messages:
+                    await asyncio.to_thread(message[3], False, e)
+                messages = []
+            finally:
+                try:
+                    await smtp.quit()
+                except Exception:
+                    smtp.close()
+
+    def send_smtp_batches(self, batches):
+        """Send every batch over its own session, at most max_concurrency sessions at once"""
+        if aiosmtplib is None:
+            raise RuntimeError("aiosmtplib is not installed; use EMAIL_DELIVERY_BACKEND=threaded")
+        asyncio.run(self._run(batches, self._send_smtp_batch))
+
+def send_reminder_batches_async(batches, outcomes=None):
+    """Async counterpart of the threaded sweep: one SMTP session per sender-account batch"""
+    # Local import: email_service imports this module to pick the backend
+    from api.email_service import build_reminder_message, record_reminder_result
+
+    smtp_server = os.environ.get('SMTP_SERVER', 'smtp.gmail.com')
+    smtp_port = int(os.environ.get('SMTP_PORT', '587'))
+    lease_state = {'renewed_at': outcomes.leased_at if outcomes is not None else None}
+    pending_ids = set()
+
+    async def renew_if_needed():
+        # Keep leases on everything not yet sent alive during a long run
+        renewed_at = lease_state['renewed_at']
+        if renewed_at is None or time.monotonic() - renewed_at <= outcomes.lease_seconds / 2:
+            return
+        lease_state['renewed_at'] = time.monotonic()
+        await asyncio.to_thread(outcomes.renew, list(pending_ids))
+
+    jobs = []
+    for batch in batches:
+        user = batch[0][3]
+        sender_email = user['email_credentials']
+        messages = []
+        for reminder, recipient_email, reminder_time, _ in batch:
+            text = build_reminder_message(
+                sender_email, recipient_email, reminder['title'], reminder['description'], reminder_time
+            )
+            pending_ids.add(reminder['id'])
+
+            def on_result(success, error=None, reminder=reminder, recipient_email=recipient_email,
+                          reminder_time=reminder_time):
+                pending_ids.discard(reminder['id'])
+                record_reminder_result(reminder, recipient_email, success, outcomes, error, reminder_time)
+
+            messages.append((sender_email, recipient_email, text, on_result))
+        jobs.append({
+            'server': smtp_server,
+            'port': smtp_port,
+            'username': sender_email,
+            'password': user['app_password'],
+            'messages': messages,
+            'before_send': renew_if_needed,
+        })
+
+    AsyncDeliveryEngine.from_env().send_smtp_batches(jobs)
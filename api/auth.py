@@ -2,24 +2,25 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from flask_login import login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash
 from flask_mail import Mail, Message
+import logging
 import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import os
 import sys
 from datetime import datetime
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail as SendGridMail, Email, To, Content
 
 # Add project directory to path for imports when running as script
 sys.path.insert(0, 'py-project')
 
+from api.email_templates import render_email
+from api.transports import send_email
 from api.mongo_handler import add_user, get_user_by_email, get_user_by_id, verify_password, generate_verification_token, set_verification_token, verify_email, generate_reset_token, set_reset_token, reset_password, update_user_email_credentials, update_user_profile_picture, update_user_bio, update_user_password
 
 # System email credentials (loaded inside functions for dynamic updates)
 
 auth_bp = Blueprint('auth', __name__)
 
+logger = logging.getLogger(__name__)
+
 mail = Mail()
 
 def send_verification_email(email, token):
@@ -35,10 +36,17 @@ def send_verification_email(email, token):
         mail.send(msg)
         return True
     except Exception as e:
-        print(f"❌ Failed to send verification email to {email}: {e}")
+        logger.warning("❌ Failed to send verification email to %s: %s", email, e)
         return False
 
 def send_reset_email(email, token, user_name='User'):
+    """Queue a password reset email; the outbox workers deliver it"""
+    from api.outbox import enqueue_email
+    enqueue_email('password_reset', {'email': email, 'token': token, 'user_name': user_name})
+    logger.info("📨 Password reset email for %s queued", email)
+    return True
+
+def deliver_reset_email(email, token, user_name='User'):
     """Send password reset email using SendGrid"""
     try:
         sendgrid_api_key = os.environ.get('SENDGRID_API_KEY')
@@ -46,158 +54,61 @@ def send_reset_email(email, token, user_name='User'):
 
         base_url = os.environ.get('BASE_URL', 'http://localhost:5000')
         reset_link = f"{base_url.rstrip('/')}/reset-password?token={token}"
-        body = f"""
-        Hello {user_name},
-
-        You requested a password reset for your Reminder App account.
-
-        Click the link below to reset your password:
-        {reset_link}
-
-        This link will expire in 1 hour.
-
-        If you didn't request this, please ignore this email.
-
-        ---
-        This is an automated email from the Reminder App.
-        """
 
-        if sendgrid_api_key:
-            # Use SendGrid for sending email
-            sg = SendGridAPIClient(sendgrid_api_key)
-            from_email = Email(SYSTEM_SENDER_EMAIL)
-            to_email = To(email)
-            subject = "Password Reset for Reminder App"
-            content = Content("text/plain", body)
-            mail = SendGridMail(from_email, to_email, subject, content)
-
-            response = sg.send(mail)
-            if response.status_code == 202:
-                print(f"✅ Password reset email sent to {email} via SendGrid")
-                return True
-            else:
-                print(f"❌ SendGrid error: {response.status_code} - {response.body}")
-                return False
+        # SendGrid if configured, then SMTP with the system account, else logged to the console
+        message = render_email(
+            'password_reset', SYSTEM_SENDER_EMAIL, email, user_name=user_name, reset_link=reset_link
+        )
+        transport = send_email(
+            message,
+            credentials=(SYSTEM_SENDER_EMAIL, os.environ.get('SYSTEM_SENDER_PASSWORD')),
+            sendgrid_api_key=sendgrid_api_key
+        )
+        if transport == 'console':
+            logger.info("✅ Password reset email for %s logged - reset link: %s", email, reset_link)
         else:
-            # Fallback to SMTP if SendGrid not configured
-            SYSTEM_SENDER_PASSWORD = os.environ.get('SYSTEM_SENDER_PASSWORD')
-            smtp_server = os.environ.get('SMTP_SERVER', 'smtp.gmail.com')
-            smtp_port = int(os.environ.get('SMTP_PORT', '587'))
-
-            if SYSTEM_SENDER_PASSWORD:
-                # Create message
-                msg = MIMEMultipart()
-                msg['From'] = SYSTEM_SENDER_EMAIL
-                msg['To'] = email
-                msg['Subject'] = "Password Reset for Reminder App"
-                msg.attach(MIMEText(body, 'plain'))
-
-                # Send email with increased timeout
-                server = smtplib.SMTP(smtp_server, smtp_port, timeout=30)
-                server.starttls()
-                server.login(SYSTEM_SENDER_EMAIL, SYSTEM_SENDER_PASSWORD)
-                text = msg.as_string()
-                server.sendmail(SYSTEM_SENDER_EMAIL, email, text)
-                server.quit()
-
-                print(f"✅ Password reset email sent to {email} via SMTP")
-            else:
-                # Fallback for development: log email content to console
-                print("⚠️ Neither SendGrid API key nor SMTP password set, logging email content for development")
-                print(f"📧 Password reset email for {email}:")
-                print(f"Subject: Password Reset for Reminder App")
-                print(f"Body:\n{body}")
-                print(f"Reset Link: {reset_link}")
-                print("✅ Password reset email logged (copy the link above to reset password)")
+            logger.info("✅ Password reset email sent to %s via %s", email, transport)
 
         return True
 
     except Exception as e:
-        print(f"❌ Error sending password reset email to {email}: {e}")
+        logger.warning("❌ Error sending password reset email to %s: %s", email, e)
         return False
 
+def deliver_credentials_verification(user_id):
+    """Send the credentials test email for a user, reading the credentials at send time"""
+    user_data = get_user_by_id(user_id)
+    if not user_data or not user_data.get('email_credentials') or not user_data.get('app_password'):
+        logger.warning("⚠️ No email credentials set for user %s", user_id)
+        return False
+    return send_verification_email_to_credentials(user_data['email_credentials'], user_data['app_password'])
+
 def send_verification_email_to_credentials(email, app_password):
     """Send verification email using SendGrid or fallback to SMTP"""
     try:
         sendgrid_api_key = os.environ.get('SENDGRID_API_KEY')
 
-        print(f"🔄 Attempting to send verification email to {email}")
-
-        body = f"""
-        Hello!
+        logger.debug("🔄 Attempting to send verification email to %s", email)
 
-        This is a test email from the Reminder App to verify your email credentials are working correctly.
-
-        Sent at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-
-        If you received this email, your settings are configured properly and reminders will be sent successfully.
-
-        ---
-        This is an automated test email from the Reminder App.
-        """
-
-        if sendgrid_api_key:
-            # Use SendGrid for sending email
-            print("📧 Using SendGrid for test email")
-            sg = SendGridAPIClient(sendgrid_api_key)
-            from_email = Email(email)  # Use user's email as sender for verification
-            to_email = To(email)
-            subject = "Email Credentials Verification - Reminder App"
-            content = Content("text/plain", body)
-            mail = SendGridMail(from_email, to_email, subject, content)
-
-            response = sg.send(mail)
-            if response.status_code == 202:
-                print(f"✅ Verification email sent successfully to {email} via SendGrid")
-                return True
-            else:
-                print(f"❌ SendGrid error: {response.status_code} - {response.body}")
-                return False
-        else:
-            # Fallback to SMTP
-            smtp_server = os.environ.get('SMTP_SERVER', 'smtp.gmail.com')
-            smtp_port = int(os.environ.get('SMTP_PORT', '587'))
-
-            print(f"📧 SMTP Server: {smtp_server}:{smtp_port}")
-
-            # Create message
-            msg = MIMEMultipart()
-            msg['From'] = email
-            msg['To'] = email
-            msg['Subject'] = "Email Credentials Verification - Reminder App"
-            msg.attach(MIMEText(body, 'plain'))
-
-            # Send email with increased timeout
-            print("🔗 Connecting to SMTP server...")
-            server = smtplib.SMTP(smtp_server, smtp_port, timeout=15)  # Reduced timeout for faster feedback
-            server.starttls()
-            print("🔐 Logging in...")
-            server.login(email, app_password)
-            print("📤 Sending email...")
-            text = msg.as_string()
-            server.sendmail(email, email, text)
-
-            # Attempt to quit the server, but don't fail if it doesn't work
-            try:
-                server.quit()
-                print("🔌 SMTP connection closed successfully")
-            except Exception as quit_error:
-                print(f"⚠️ Warning: Failed to quit SMTP server gracefully: {quit_error}")
-
-            print(f"✅ Verification email sent successfully to {email} via SMTP")
-            return True
+        # Use user's email as sender for verification
+        message = render_email(
+            'credentials_verification', email, email, sent_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        )
+        transport = send_email(message, credentials=(email, app_password), sendgrid_api_key=sendgrid_api_key)
+        logger.info("✅ Verification email sent successfully to %s via %s", email, transport)
+        return True
 
     except smtplib.SMTPConnectError as e:
-        print(f"❌ SMTP Connection Error: {e}")
+        logger.warning("❌ SMTP Connection Error: %s", e)
         return False
     except smtplib.SMTPAuthenticationError as e:
-        print(f"❌ SMTP Authentication Error: {e}")
+        logger.warning("❌ SMTP Authentication Error: %s", e)
         return False
     except smtplib.SMTPException as e:
-        print(f"❌ SMTP Error: {e}")
+        logger.warning("❌ SMTP Error: %s", e)
         return False
     except Exception as e:
-        print(f"❌ Unexpected error sending verification email to {email}: {e}")
+        logger.warning("❌ Unexpected error sending verification email to %s: %s", email, e)
         return False
 
 class User:
@@ -315,10 +226,32 @@ def reset_password_route():
 
 
 
+def flash_verification_status():
+    """Report the outcome of the last queued verification email, once it is known"""
+    from api.mongo_handler import get_outbox_job, OUTBOX_SENT, OUTBOX_DEAD
+    job_id = session.get('verification_job_id')
+    if not job_id:
+        return
+    job = get_outbox_job(job_id)
+    if job is None:
+        session.pop('verification_job_id', None)
+    elif job['status'] == OUTBOX_SENT:
+        session.pop('verification_job_id', None)
+        flash('Verification email sent successfully! Check your email.', 'success')
+    elif job['status'] == OUTBOX_DEAD:
+        session.pop('verification_job_id', None)
+        flash('Failed to send verification email. Please check your credentials.', 'error')
+    else:
+        # Without a worker (e.g. on Vercel) the job waits for the next cron drain of the outbox
+        flash('Verification email queued. It goes out with the next delivery run, which may take a few minutes; '
+              'check back on this page for the result.', 'info')
+
 @auth_bp.route('/email-credentials', methods=['GET', 'POST'])
 @login_required
 def email_credentials():
     from api.mongo_handler import update_user_email_credentials, get_user_by_id
+    if request.method == 'GET':
+        flash_verification_status()
     user_data = get_user_by_id(current_user.get_id())
     current_email = user_data.get('email_credentials', '') if user_data else ''
     current_app_password = user_data.get('app_password', '') if user_data else ''
@@ -338,18 +271,16 @@ def email_credentials():
 @login_required
 def send_verification_email():
     from api.mongo_handler import get_user_by_id
+    from api.outbox import enqueue_email
     user_data = get_user_by_id(current_user.get_id())
     if user_data and user_data.get('email_credentials') and user_data.get('app_password'):
-        app_password = user_data['app_password']
         try:
-            result = send_verification_email_to_credentials(user_data['email_credentials'], app_password)
-            if result:
-                flash('Verification email sent successfully! Check your email.', 'success')
-            else:
-                flash('Failed to send verification email. Please check your credentials.', 'error')
+            # Sent by the outbox workers; the credentials page reports the status, so nothing is flashed here
+            job_id = enqueue_email('credentials_verification', {'user_id': user_data['id']}, max_attempts=1)
+            session['verification_job_id'] = job_id
         except Exception as e:
-            print(f"Error sending verification email: {e}")
-            flash('Failed to send verification email. Please check your credentials.', 'error')
+            logger.warning("Error queueing verification email: %s", e)
+            flash('Failed to send verification email. Please try again.', 'error')
     else:
         flash('Please set your email credentials first.', 'error')
     return redirect(url_for('auth.email_credentials'))
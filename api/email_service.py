@@ -1,283 +1,339 @@
+import logging
 import os
 import sys
 from datetime import datetime
 import concurrent.futures
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import socket
+import time
 
 # Add project directory to path for imports when running as script
 sys.path.insert(0, 'py-project')
 
-from api.mongo_handler import get_all_reminders, mark_reminder_completed, get_user_by_id
-
-# Email configuration (should be moved to environment variables in production)
-# No default credentials, user must set their own
-DEFAULT_SENDER_EMAIL = None
-DEFAULT_APP_PASSWORD = None
-
-# System email credentials for auth notifications (password reset, confirmations)
-# Load from environment variables inside functions for dynamic updates
-
-def send_reminder_email(receiver_email, reminder_title, reminder_description, reminder_time, user_id=None):
-    """Send a reminder email to the specified recipient using SMTP"""
-    try:
-        # Get user-specific credentials
-        if user_id:
-            user = get_user_by_id(user_id)
-            sender_email = user.get('email_credentials') if user else None
-            sender_password = user.get('app_password') if user else None
-        else:
-            sender_email = None
-            sender_password = None
-
-        # Check if credentials are set
-        if not sender_email or not sender_password:
-            print(f"❌ Email credentials not set for user {user_id}. Please set email credentials in settings.")
-            return False
-
-        # SMTP server settings (default to Gmail)
-        smtp_server = os.environ.get('SMTP_SERVER', 'smtp.gmail.com')
-        smtp_port = int(os.environ.get('SMTP_PORT', '587'))
-
-        # Create message
-        msg = MIMEMultipart()
-        msg['From'] = sender_email
-        msg['To'] = receiver_email
-        msg['Subject'] = f"Reminder: {reminder_title}"
-
-        body = f"""
-        Hello!
-
-        This is a reminder for: {reminder_title}
-
-        Description: {reminder_description or 'No description provided'}
-
-        Scheduled Time: {reminder_time.strftime('%Y-%m-%d %H:%M')}
-
-        ---
-        This is an automated reminder from the Reminder App.
-        """
-        msg.attach(MIMEText(body, 'plain'))
-
-        # Send email
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(sender_email, sender_password)
-        text = msg.as_string()
-        server.sendmail(sender_email, receiver_email, text)
-
-        # Attempt to quit the server, but don't fail if it doesn't work
-        try:
-            server.quit()
-        except Exception as quit_error:
-            print(f"⚠️ Warning: Failed to quit SMTP server gracefully: {quit_error}")
-
-        print(f"✅ Email sent successfully to {receiver_email}")
-        return True
+from api.smtp_pool import MESSAGE_ERRORS
+from api.metrics import (
+    SWEEP_DURATION, REMINDERS_DUE, REMINDERS_QUEUED, REMINDERS_SKIPPED, REMINDERS_SENT, REMINDERS_FAILED,
+    REMINDER_DELIVERY_LAG
+)
+from api.sendgrid_transport import get_sendgrid_transport
+from api.email_templates import TEMPLATES, render_email
+from api.transports import SINK_TRANSPORTS, SMTPTransport, configured_transport, get_sink_transport, send_email
+from api.async_delivery import async_backend_available, send_reminder_batches_async
+from api.mongo_handler import lease_due_reminders, release_reminder_leases, enqueue_outbox_jobs, mark_reminder_completed, get_users_by_ids, parse_reminder_time, track_upcoming_reminders
+
+logger = logging.getLogger(__name__)
+
+def reminder_email(sender_email, receiver_email, reminder_title, reminder_description, reminder_time):
+    return render_email(
+        'reminder', sender_email, receiver_email,
+        title=reminder_title,
+        description=reminder_description or 'No description provided',
+        scheduled_time=reminder_time.strftime('%Y-%m-%d %H:%M'),
+    )
 
-    except Exception as e:
-        print(f"❌ Error sending email to {receiver_email}: {e}")
-        return False
+def build_reminder_message(sender_email, receiver_email, reminder_title, reminder_description, reminder_time):
+    """Build the reminder email and return it serialized for sendmail"""
+    return reminder_email(sender_email, receiver_email, reminder_title, reminder_description, reminder_time).as_string()
 
 def send_test_email(sender_email, sender_password, test_recipient_email):
     """Send a test email to verify credentials using SMTP"""
     try:
-        # SMTP server settings (default to Gmail)
-        smtp_server = os.environ.get('SMTP_SERVER', 'smtp.gmail.com')
-        smtp_port = int(os.environ.get('SMTP_PORT', '587'))
-
-        # Create message
-        msg = MIMEMultipart()
-        msg['From'] = sender_email
-        msg['To'] = test_recipient_email
-        msg['Subject'] = "Test Email from Reminder App"
-
-        body = """
-        Hello!
-
-        This is a test email from the Reminder App to verify your email credentials are working correctly.
-
-        If you received this email, your settings are configured properly.
-
-        ---
-        This is an automated test email from the Reminder App.
-        """
-        msg.attach(MIMEText(body, 'plain'))
-
-        # Send email
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(sender_email, sender_password)
-        text = msg.as_string()
-        server.sendmail(sender_email, test_recipient_email, text)
+        message = render_email('test_email', sender_email, test_recipient_email)
+        send_email(message, credentials=(sender_email, sender_password))
 
-        # Attempt to quit the server, but don't fail if it doesn't work
-        try:
-            server.quit()
-        except Exception as quit_error:
-            print(f"⚠️ Warning: Failed to quit SMTP server gracefully: {quit_error}")
-
-        print(f"✅ Test email sent successfully to {test_recipient_email}")
+        logger.info("✅ Test email sent successfully to %s", test_recipient_email)
         return True
 
     except Exception as e:
-        print(f"❌ Error sending test email to {test_recipient_email}: {e}")
+        logger.error("❌ Error sending test email to %s: %s", test_recipient_email, e)
         return False
 
+def get_worker_id():
+    """Identify this sweeper process as a lease owner"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
 def check_and_send_reminders(app):
-    """Check for reminders that are due and send emails"""
-    with app.app_context():
+    """Check for reminders that are due and queue them for delivery"""
+    with app.app_context(), SWEEP_DURATION.time(mode='sweep'):
         current_time = datetime.now()
-        print(f"🔄 Checking reminders at {current_time}")
-
-        # Get all reminders
-        all_reminders = get_all_reminders()
-        print(f"📋 Found {len(all_reminders)} total reminders")
-
-        # Collect reminders to send
-        reminders_to_send = []
-        for reminder in all_reminders:
-            print(f"🔍 Checking reminder '{reminder['title']}' - Completed: {reminder['is_completed']}")
-
-            # Skip completed reminders
-            if reminder['is_completed'] == True or str(reminder['is_completed']).lower() == 'true':
-                continue
-
-            # Parse reminder time
+        logger.debug("🔄 Checking reminders at %s", current_time)
+
+        owner = get_worker_id()
+        lease_seconds = int(os.environ.get('REMINDER_LEASE_SECONDS', '300'))
+        lease_batch_size = int(os.environ.get('REMINDER_LEASE_BATCH_SIZE', '500'))
+
+        # Lease due reminders batch by batch until none are left for this worker
+        total = 0
+        queued = 0
+        while True:
+            leased = lease_due_reminders(owner, lease_seconds, lease_batch_size)
+            if not leased:
+                break
+            total += len(leased)
             try:
-                if isinstance(reminder['reminder_time'], str):
-                    reminder_time = datetime.strptime(reminder['reminder_time'], '%Y-%m-%d %H:%M:%S')
-                elif isinstance(reminder['reminder_time'], datetime):
-                    reminder_time = reminder['reminder_time']
-                else:
-                    print(f"   ❌ Invalid reminder time type: {type(reminder['reminder_time'])}")
-                    continue
-                print(f"   Reminder time: {reminder_time}, Current time: {current_time}")
-            except ValueError:
-                print(f"   ❌ Invalid reminder time format: {reminder['reminder_time']}")
-                continue
-
-            # Check if reminder is due
-            if reminder_time <= current_time:
-                print(f"   ✅ Reminder is due")
-                user = get_user_by_id(str(reminder['user_id']))
-                if user:
-                    # Check if user has set email credentials
-                    if not user.get('email_credentials') or not user.get('app_password'):
-                        print(f"⚠️  Skipping reminder '{reminder['title']}' - user {reminder['user_id']} has not set email credentials")
-                        continue
-
-                    # Mark reminder as completed immediately to prevent duplicate sends
-                    if not mark_reminder_completed(reminder['id']):
-                        print(f"   ❌ Failed to mark reminder '{reminder['title']}' as completed, skipping")
-                        continue
-
-                    # Use custom recipient email if provided, otherwise use user's email
-                    recipient_email = reminder.get('recipient_email', '') or user['email']
-                    print(f"   📧 Will send to {recipient_email}")
-
-                    reminders_to_send.append((reminder, recipient_email, reminder_time, user))
-                else:
-                    print(f"   ❌ User {reminder['user_id']} not found")
-                    # Add error handling to avoid crash
-                    continue
-            else:
-                print(f"   ⏰ Reminder not yet due")
-
-        # Send emails in parallel
-        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-            futures = [
-                executor.submit(send_reminder_and_mark, reminder, recipient_email, reminder_time, user)
-                for reminder, recipient_email, reminder_time, user in reminders_to_send
-            ]
-            for future in concurrent.futures.as_completed(futures):
-                try:
-                    future.result()
-                except Exception as e:
-                    print(f"❌ Error in sending reminder: {e}")
-
-def send_reminder_and_mark(reminder, recipient_email, reminder_time, user):
-    """Send reminder email and mark as completed"""
-    success = send_reminder_email(
-        recipient_email,
-        reminder['title'],
-        reminder['description'],
-        reminder_time,
-        reminder['user_id']
+                queued += enqueue_leased_reminders(leased)
+            except Exception:
+                # Retry these once the leases expire rather than at the next safety poll
+                track_upcoming_reminders(reminder['id'] for reminder in leased)
+                raise
+
+        logger.info("📋 Processed %d due reminders, queued %d for delivery", total, queued,
+                    extra={'due': total, 'queued': queued})
+        if queued:
+            from api.outbox import wake_delivery_workers
+            wake_delivery_workers()
+
+def dispatch_reminders(app, reminder_ids):
+    """Lease and queue specific reminders, e.g. ones popped from the upcoming-reminder heap"""
+    with app.app_context(), SWEEP_DURATION.time(mode='dispatch'):
+        owner = get_worker_id()
+        lease_seconds = int(os.environ.get('REMINDER_LEASE_SECONDS', '300'))
+        leased = lease_due_reminders(owner, lease_seconds, reminder_ids=reminder_ids)
+        logger.info("🚀 Dispatching %d of %d reminders due now", len(leased), len(reminder_ids))
+        leased_ids = {reminder['id'] for reminder in leased}
+        # Another worker holds the rest; they come back due when its lease expires
+        track_upcoming_reminders(reminder_id for reminder_id in reminder_ids if reminder_id not in leased_ids)
+        try:
+            queued = leased and enqueue_leased_reminders(leased)
+        except Exception:
+            # Our leases were not released; retry once they expire rather than at the next safety poll
+            track_upcoming_reminders(leased_ids)
+            raise
+        if queued:
+            from api.outbox import wake_delivery_workers
+            wake_delivery_workers()
+
+def enqueue_leased_reminders(leased):
+    """Turn leased reminders into outbox jobs and release the leases; returns the number queued"""
+    # Resolve every owner of a due reminder in a single query
+    users = get_users_by_ids(str(reminder['user_id']) for reminder in leased)
+    REMINDERS_DUE.inc(len(leased))
+
+    jobs = []
+    queued_ids = []
+    failed_ids = []
+    for reminder in leased:
+        # Parse reminder time (legacy rows may still hold a string)
+        try:
+            reminder_time = parse_reminder_time(reminder['reminder_time'])
+        except ValueError:
+            logger.warning("❌ Invalid reminder time format: %s", reminder['reminder_time'],
+                           extra={'reminder_id': reminder['id'], 'sampled': True})
+            REMINDERS_SKIPPED.inc(reason='invalid_time')
+            failed_ids.append(reminder['id'])
+            continue
+
+        logger.debug("🔍 Reminder '%s' is due (%s)", reminder['title'], reminder_time)
+        user = users.get(str(reminder['user_id']))
+        if not user:
+            logger.warning("❌ User %s not found", reminder['user_id'],
+                           extra={'reminder_id': reminder['id'], 'sampled': True})
+            REMINDERS_SKIPPED.inc(reason='user_missing')
+            failed_ids.append(reminder['id'])
+            continue
+
+        # Check if user has set email credentials
+        if not user.get('email_credentials') or not user.get('app_password'):
+            logger.warning("⚠️ Skipping reminder - user %s has not set email credentials", reminder['user_id'],
+                           extra={'reminder_id': reminder['id'], 'sampled': True})
+            REMINDERS_SKIPPED.inc(reason='no_credentials')
+            failed_ids.append(reminder['id'])
+            continue
+
+        # Use custom recipient email if provided, otherwise use user's email
+        recipient_email = reminder.get('recipient_email', '') or user['email']
+        logger.debug("📧 Will send to %s", recipient_email)
+
+        # Credentials are looked up again at delivery time, never stored in the queue
+        jobs.append({
+            'kind': 'reminder',
+            'dedupe_key': f"reminder:{reminder['id']}:{reminder_time.isoformat()}",
+            'payload': {
+                'reminder_id': reminder['id'],
+                'user_id': str(reminder['user_id']),
+                'recipient_email': recipient_email,
+                'title': reminder['title'],
+                'description': reminder.get('description'),
+                'reminder_time': reminder_time,
+            },
+        })
+        queued_ids.append(reminder['id'])
+
+    enqueue_outbox_jobs(jobs)
+    retry_delay = int(os.environ.get('REMINDER_RETRY_DELAY', '300'))
+    release_reminder_leases({reminder['lease_id'] for reminder in leased}, queued_ids, failed_ids, retry_delay)
+    REMINDERS_QUEUED.inc(len(queued_ids))
+    return len(queued_ids)
+
+def send_reminder_items(reminders_to_send, outcomes):
+    """Send (reminder, recipient_email, reminder_time, user) items, one SMTP session per sender-account batch"""
+    transport_name = configured_transport()
+    if transport_name in SINK_TRANSPORTS:
+        send_reminder_items_to_sink(reminders_to_send, get_sink_transport(transport_name), outcomes)
+        return
+    sendgrid_api_key = os.environ.get('REMINDER_SENDGRID_API_KEY')
+    if transport_name == 'sendgrid':
+        sendgrid_api_key = sendgrid_api_key or os.environ.get('SENDGRID_API_KEY')
+    if sendgrid_api_key and transport_name != 'smtp':
+        send_reminder_items_sendgrid(reminders_to_send, sendgrid_api_key, outcomes)
+        return
+
+    batches = plan_deliveries(reminders_to_send)
+    logger.info("📦 Sending %d reminders in %d batches", len(reminders_to_send), len(batches))
+    if batches and get_delivery_backend() == 'async':
+        try:
+            send_reminder_batches_async(batches, outcomes)
+        except Exception as e:
+            logger.exception("❌ Error in async reminder delivery: %s", e)
+        return
+
+    max_workers = int(os.environ.get('REMINDER_MAX_WORKERS', '10'))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(send_reminder_batch, batch, outcomes) for batch in batches]
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                logger.exception("❌ Error in sending reminder: %s", e)
+
+def send_reminder_items_to_sink(reminders_to_send, transport, outcomes=None):
+    """Hand reminders to a local sink transport (console, file, memory or null) one by one"""
+    for reminder, recipient_email, reminder_time, user in reminders_to_send:
+        message = reminder_email(
+            user['email_credentials'], recipient_email, reminder['title'], reminder['description'], reminder_time
+        )
+        error = None
+        try:
+            transport.send(message)
+        except Exception as e:
+            error = e
+        record_reminder_result(reminder, recipient_email, error is None, outcomes, error, reminder_time)
+
+def send_reminder_items_sendgrid(reminders_to_send, api_key, outcomes=None):
+    """Send reminders through the operator's SendGrid account, one API call per sender and 1000 recipients"""
+    from_override = os.environ.get('REMINDER_SENDGRID_FROM')
+    transport = get_sendgrid_transport()
+    # Every reminder shares one template; the per-reminder fields go in as substitutions
+    subject, text, _ = TEMPLATES['reminder'].render(
+        title='-title-', description='-description-', scheduled_time='-scheduled_time-'
     )
+    groups = plan_deliveries(reminders_to_send, sessions_per_account=1)
+    logger.info("📦 Sending %d reminders via SendGrid for %d senders", len(reminders_to_send), len(groups))
+    for batch in groups:
+        sender_email = batch[0][3]['email_credentials']
+        recipients = [
+            (recipient_email, {
+                '-title-': reminder['title'],
+                '-description-': reminder['description'] or 'No description provided',
+                '-scheduled_time-': reminder_time.strftime('%Y-%m-%d %H:%M'),
+            })
+            for reminder, recipient_email, reminder_time, _ in batch
+        ]
+        # A verified operator address can send on the user's behalf, with replies going to the user
+        results = transport.send_personalized(
+            api_key, from_override or sender_email, subject, text, recipients,
+            reply_to=sender_email if from_override else None
+        )
+        for (reminder, recipient_email, reminder_time, _), (success, error) in zip(batch, results):
+            record_reminder_result(reminder, recipient_email, success, outcomes, error, reminder_time)
+
+def get_delivery_backend():
+    """EMAIL_DELIVERY_BACKEND: 'threaded' (default) or 'async' (needs aiosmtplib); applies to SMTP delivery only"""
+    backend = os.environ.get('EMAIL_DELIVERY_BACKEND', 'threaded').lower()
+    if backend == 'async' and not async_backend_available():
+        logger.warning("⚠️ EMAIL_DELIVERY_BACKEND=async but aiosmtplib is not installed, using threads")
+        return 'threaded'
+    return backend
+
+def plan_deliveries(reminders_to_send, sessions_per_account=None):
+    """Group reminders by sender account, split across at most N sessions per account"""
+    if sessions_per_account is None:
+        sessions_per_account = int(os.environ.get('REMINDER_SESSIONS_PER_ACCOUNT', '1'))
+    groups = {}
+    for item in reminders_to_send:
+        user = item[3]
+        groups.setdefault(user['email_credentials'], []).append(item)
+
+    batches = []
+    for items in groups.values():
+        sessions = max(1, min(sessions_per_account, len(items)))
+        batches.extend(items[i::sessions] for i in range(sessions))
+    # Start the biggest batches first so they do not finish last
+    batches.sort(key=len, reverse=True)
+    return batches
+
+def send_reminder_batch(batch, outcomes=None):
+    """Send a batch of reminders from one sender account back-to-back over one SMTP session"""
+    user = batch[0][3]
+    sender_email = user['email_credentials']
+    credentials = (sender_email, user['app_password'])
+    sink = get_sink_transport()
+    if sink is not None:
+        # EMAIL_TRANSPORT points at a local sink; nothing goes over SMTP
+        send_reminder_items_to_sink(batch, sink, outcomes)
+        return
+    transport = SMTPTransport()
+
+    remaining = list(batch)
+    renewed_at = outcomes.leased_at if outcomes is not None else None
+    while remaining:
+        sent_on_session = 0
+        try:
+            with transport.session(credentials) as send:
+                while remaining:
+                    # Keep our leases alive while a long batch is still sending
+                    if renewed_at is not None and time.monotonic() - renewed_at > outcomes.lease_seconds / 2:
+                        outcomes.renew([item[0]['id'] for item in remaining])
+                        renewed_at = time.monotonic()
+                    reminder, recipient_email, reminder_time, _ = remaining[0]
+                    message = reminder_email(
+                        sender_email, recipient_email, reminder['title'], reminder['description'], reminder_time
+                    )
+                    error = None
+                    try:
+                        send(message)
+                    except MESSAGE_ERRORS as e:
+                        logger.warning("❌ Error sending email to %s: %s", recipient_email, e,
+                                       extra={'reminder_id': reminder['id'], 'sampled': True})
+                        error = e
+                    remaining.pop(0)
+                    sent_on_session += 1
+                    record_reminder_result(reminder, recipient_email, error is None, outcomes, error, reminder_time)
+        except Exception as e:
+            logger.error("❌ SMTP session for %s failed: %s", sender_email, e)
+            # Reconnect if the dropped session made progress; otherwise give up on the rest
+            if sent_on_session and remaining:
+                continue
+            for reminder, recipient_email, reminder_time, _ in remaining:
+                record_reminder_result(reminder, recipient_email, False, outcomes, e, reminder_time)
+            remaining = []
+
+def record_reminder_result(reminder, recipient_email, success, outcomes=None, error=None, reminder_time=None):
+    """Log a send outcome and hand it to the outcome buffer (or mark the reminder directly)"""
+    if outcomes is not None:
+        outcomes.add(reminder['id'], success, error)
+    else:
+        mark_reminder_completed(reminder['id'], success)
 
     if success:
-        # Reminder is already marked as completed before sending, so just log
-        print(f"✅ Reminder '{reminder['title']}' sent to {recipient_email} and marked as completed")
+        REMINDERS_SENT.inc()
+        if reminder_time is not None:
+            REMINDER_DELIVERY_LAG.observe(max(0.0, (datetime.now() - reminder_time).total_seconds()))
+        logger.debug("✅ Reminder '%s' sent to %s", reminder['title'], recipient_email)
     else:
-        # If sending failed, mark reminder as not completed again to allow retry
-        mark_reminder_completed(reminder['id'], False)
-        print(f"❌ Failed to send reminder '{reminder['title']}' to {recipient_email}, marked as not completed for retry")
+        REMINDERS_FAILED.inc()
+        logger.warning("❌ Failed to send reminder to %s, will retry", recipient_email,
+                       extra={'reminder_id': reminder['id'], 'sampled': True})
 
 def send_password_reset_email(user_email, reset_token, user_name):
-    """Send password reset email with link using SMTP"""
+    """Queue a password reset email with link; delivery happens in the outbox workers"""
     try:
-        SYSTEM_SENDER_EMAIL = os.environ.get('SYSTEM_SENDER_EMAIL') or "noreply@reminderapp.local"
-        SYSTEM_SENDER_PASSWORD = os.environ.get('SYSTEM_SENDER_PASSWORD')
-
-        # SMTP server settings (default to Gmail)
-        smtp_server = os.environ.get('SMTP_SERVER', 'smtp.gmail.com')
-        smtp_port = int(os.environ.get('SMTP_PORT', '587'))
-
-        base_url = os.environ.get('BASE_URL', 'http://localhost:5000')
-        reset_link = f"{base_url.rstrip('/')}/reset-password?token={reset_token}"
-        body = f"""
-        Hello {user_name},
-
-        You requested a password reset for your Reminder App account.
-
-        Click the link below to reset your password:
-        {reset_link}
-
-        This link will expire in 1 hour.
-
-        If you didn't request this, please ignore this email.
-
-        ---
-        This is an automated email from the Reminder App.
-        """
-
-        if SYSTEM_SENDER_PASSWORD:
-            # Create message
-            msg = MIMEMultipart()
-            msg['From'] = SYSTEM_SENDER_EMAIL
-            msg['To'] = user_email
-            msg['Subject'] = "Password Reset for Reminder App"
-            msg.attach(MIMEText(body, 'plain'))
-
-            # Send email
-            server = smtplib.SMTP(smtp_server, smtp_port)
-            server.starttls()
-            server.login(SYSTEM_SENDER_EMAIL, SYSTEM_SENDER_PASSWORD)
-            text = msg.as_string()
-            server.sendmail(SYSTEM_SENDER_EMAIL, user_email, text)
-
-            # Attempt to quit the server, but don't fail if it doesn't work
-            try:
-                server.quit()
-            except Exception as quit_error:
-                print(f"⚠️ Warning: Failed to quit SMTP server gracefully: {quit_error}")
-
-            print(f"✅ Password reset email sent to {user_email}")
-        else:
-            # Fallback for development: log email content to console
-            print("⚠️ SYSTEM_SENDER_PASSWORD not set, logging email content for development")
-            print(f"📧 Password reset email for {user_email}:")
-            print(f"Subject: Password Reset for Reminder App")
-            print(f"Body:\n{body}")
-            print(f"Reset Link: {reset_link}")
-            print("✅ Password reset email logged (copy the link above to reset password)")
-
+        from api.outbox import enqueue_email
+        enqueue_email('password_reset', {'email': user_email, 'token': reset_token, 'user_name': user_name})
+        logger.info("📨 Password reset email for %s queued", user_email)
         return True
 
     except Exception as e:
-        print(f"❌ Error sending password reset email to {user_email}: {e}")
+        logger.error("❌ Error queueing password reset email to %s: %s", user_email, e)
         return False
 
 def send_email_confirmation_otp(user_email, otp, user_name):
@@ -286,53 +342,16 @@ def send_email_confirmation_otp(user_email, otp, user_name):
         SYSTEM_SENDER_EMAIL = os.environ.get('SYSTEM_SENDER_EMAIL') or "noreply@reminderapp.local"
         SYSTEM_SENDER_PASSWORD = os.environ.get('SYSTEM_SENDER_PASSWORD')
 
-        # SMTP server settings (default to Gmail)
-        smtp_server = os.environ.get('SMTP_SERVER', 'smtp.gmail.com')
-        smtp_port = int(os.environ.get('SMTP_PORT', '587'))
-
-        body = f"""
-        Hello {user_name},
-
-        Your OTP for email confirmation is: {otp}
-
-        This code expires in 5 minutes.
-
-        ---
-        This is an automated email from the Reminder App.
-        """
-
-        if SYSTEM_SENDER_PASSWORD:
-            # Create message
-            msg = MIMEMultipart()
-            msg['From'] = SYSTEM_SENDER_EMAIL
-            msg['To'] = user_email
-            msg['Subject'] = "Email Confirmation Code for Reminder App"
-            msg.attach(MIMEText(body, 'plain'))
-
-            # Send email
-            server = smtplib.SMTP(smtp_server, smtp_port)
-            server.starttls()
-            server.login(SYSTEM_SENDER_EMAIL, SYSTEM_SENDER_PASSWORD)
-            text = msg.as_string()
-            server.sendmail(SYSTEM_SENDER_EMAIL, user_email, text)
-
-            # Attempt to quit the server, but don't fail if it doesn't work
-            try:
-                server.quit()
-            except Exception as quit_error:
-                print(f"⚠️ Warning: Failed to quit SMTP server gracefully: {quit_error}")
-
-            print(f"✅ OTP email sent to {user_email}")
+        message = render_email('otp', SYSTEM_SENDER_EMAIL, user_email, user_name=user_name, otp=otp)
+        # Without SYSTEM_SENDER_PASSWORD the email is logged to the console for development
+        transport = send_email(message, credentials=(SYSTEM_SENDER_EMAIL, SYSTEM_SENDER_PASSWORD))
+        if transport == 'console':
+            logger.info("✅ OTP email logged (use the OTP above for confirmation)")
         else:
-            # Fallback for development: log email content to console
-            print("⚠️ SYSTEM_SENDER_PASSWORD not set, logging email content for development")
-            print(f"📧 OTP email for {user_email}:")
-            print(f"Subject: Email Confirmation Code for Reminder App")
-            print(f"Body:\n{body}")
-            print("✅ OTP email logged (use the OTP above for confirmation)")
+            logger.info("✅ OTP email sent to %s", user_email)
 
         return True
 
     except Exception as e:
-        print(f"❌ Error sending OTP email to {user_email}: {e}")
+        logger.error("❌ Error sending OTP email to %s: %s", user_email, e)
         return False
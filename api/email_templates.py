@@ -0,0 +1,143 @@
+import html
+import os
+import textwrap
+from string import Template
+
+from api.transports import EmailMessage
+
+class EmailTemplate:
+    """Subject, text and optional HTML bodies compiled once into string.Template objects"""
+
+    def __init__(self, name, subject, text, html_body=None):
+        self.name = name
+        self.subject = Template(subject)
+        # Bodies are written indented below; strip that once here instead of on every send
+        self.text = Template(textwrap.dedent(text).strip() + '\n')
+        self.html = Template(textwrap.dedent(html_body).strip() + '\n') if html_body else None
+
+    def render(self, include_html=False, **fields):
+        """Return (subject, text, html or None)"""
+        subject = self.subject.substitute(fields)
+        text = self.text.substitute(fields)
+        html_text = None
+        if include_html and self.html is not None:
+            html_text = self.html.substitute({key: html.escape(str(value)) for key, value in fields.items()})
+        return subject, text, html_text
+
+TEMPLATES = {}
+
+def register_template(name, subject, text, html_body=None):
+    TEMPLATES[name] = EmailTemplate(name, subject, text, html_body)
+    return TEMPLATES[name]
+
+def html_enabled():
+    """EMAIL_HTML=true adds an HTML alternative to templates that define one"""
+    return os.environ.get('EMAIL_HTML', 'false').lower() in ['true', '1', 't']
+
+def render_email(name, sender, recipient, reply_to=None, include_html=None, **fields):
+    """Render a registered template into an EmailMessage"""
+    if include_html is None:
+        include_html = html_enabled()
+    subject, text, html_text = TEMPLATES[name].render(include_html, **fields)
+    return EmailMessage(sender, recipient, subject, text, reply_to=reply_to, html=html_text)
+
+register_template(
+    'reminder',
+    "Reminder: $title",
+    """
+    Hello!
+
+    This is a reminder for: $title
+
+    Description: $description
+
+    Scheduled Time: $scheduled_time
+
+    ---
+    This is an automated reminder from the Reminder App.
+    """,
+    """
+    <p>Hello!</p>
+    <p>This is a reminder for: <strong>$title</strong></p>
+    <p>Description: $description</p>
+    <p>Scheduled Time: $scheduled_time</p>
+    <hr>
+    <p><small>This is an automated reminder from the Reminder App.</small></p>
+    """
+)
+
+register_template(
+    'test_email',
+    "Test Email from Reminder App",
+    """
+    Hello!
+
+    This is a test email from the Reminder App to verify your email credentials are working correctly.
+
+    If you received this email, your settings are configured properly.
+
+    ---
+    This is an automated test email from the Reminder App.
+    """
+)
+
+register_template(
+    'credentials_verification',
+    "Email Credentials Verification - Reminder App",
+    """
+    Hello!
+
+    This is a test email from the Reminder App to verify your email credentials are working correctly.
+
+    Sent at: $sent_at
+
+    If you received this email, your settings are configured properly and reminders will be sent successfully.
+
+    ---
+    This is an automated test email from the Reminder App.
+    """
+)
+
+register_template(
+    'password_reset',
+    "Password Reset for Reminder App",
+    """
+    Hello $user_name,
+
+    You requested a password reset for your Reminder App account.
+
+    Click the link below to reset your password:
+    $reset_link
+
+    This link will expire in 1 hour.
+
+    If you didn't request this, please ignore this email.
+
+    ---
+    This is an automated email from the Reminder App.
+    """,
+    """
+    <p>Hello $user_name,</p>
+    <p>You requested a password reset for your Reminder App account.</p>
+    <p><a href="$reset_link">Reset your password</a></p>
+    <p>This link will expire in 1 hour.</p>
+    <p>If you didn't request this, please ignore this email.</p>
+    <hr>
+    <p><small>This is an automated email from the Reminder App.</small></p>
+    """
+)
+
+register_template(
+    'otp',
+    "Email Confirmation Code for Reminder App",
+    """
+    Hello $user_name,
+
+    Your OTP for email confirmation is: $otp
+
+    This code expires in 5 minutes.
+
+    ---
+    This is an automated email from the Reminder App.
+    """
+)
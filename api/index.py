@@ -1,17 +1,22 @@
+import logging
+
 from flask import Flask, redirect, url_for
 from flask_login import LoginManager
 from flask_mail import Mail
 import os
 from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.executors.pool import ThreadPoolExecutor, ProcessPoolExecutor
 from apscheduler.executors.asyncio import AsyncIOExecutor
 
-from flask import Flask, jsonify
+from flask import Flask, jsonify, Response, request
 
 from api.auth import User, mail
-from api.mongo_handler import get_user_by_id
+from api.mongo_handler import get_user_by_id, ensure_indexes
 from api.email_service import check_and_send_reminders
+from api.scheduler import start_reminder_scheduler, start_outbox_poller
+from api.outbox import drain_outbox
+from api.metrics import render_metrics
+from api.logging_config import configure_logging
 
 # Load environment variables from .env file if it exists
 try:
@@ -20,10 +25,13 @@ try:
 except ImportError:
     pass  # python-dotenv not installed, skip loading .env
 
+logger = logging.getLogger(__name__)
+
 # Initialize extensions
 login_manager = LoginManager()
 
 def create_app():
+    configure_logging()
     app = Flask(__name__, template_folder=os.path.join(os.path.dirname(__file__), '..', 'templates'))
 
     # Validate required environment variables
@@ -31,7 +39,7 @@ def create_app():
     missing_vars = [var for var in required_env_vars if not os.environ.get(var)]
     if missing_vars:
         import sys
-        print(f"❌ Missing required environment variables: {', '.join(missing_vars)}", file=sys.stderr)
+        logger.error("❌ Missing required environment variables: %s", ', '.join(missing_vars))
         sys.exit(1)
 
     @app.errorhandler(404)
@@ -41,15 +49,13 @@ def create_app():
     @app.errorhandler(500)
     def internal_error(e):
         # Log the error and return JSON response
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Unhandled error: %s", e)
         return jsonify(error=str(e)), 500
 
     @app.errorhandler(Exception)
     def handle_exception(e):
         # Log the error and return JSON response
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Unhandled error: %s", e)
         return jsonify(error=str(e)), 500
 
     @login_manager.user_loader
@@ -76,6 +82,16 @@ def create_app():
     app.config['PERMANENT_SESSION_LIFETIME'] = 30 * 24 * 60 * 60  # 30 days
     app.config['SESSION_PERMANENT'] = True
 
+    # Make sure the declared indexes exist. Serverless cold starts skip this by default
+    # (run scripts/ensure_indexes.py on deploy instead) so they do not connect up front.
+    default_ensure = 'false' if os.environ.get('VERCEL') else 'true'
+    if os.environ.get('ENSURE_INDEXES_ON_STARTUP', default_ensure).lower() in ['true', '1', 't']:
+        try:
+            for name, error in ensure_indexes():
+                logger.warning("⚠️ Failed to create MongoDB index %s: %s", name, error)
+        except Exception as e:
+            logger.warning("⚠️ Failed to ensure MongoDB indexes: %s", e)
+
     # Initialize extensions with app
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
@@ -91,11 +107,23 @@ def create_app():
 
     @app.route('/cron/reminders')
     def cron_reminders():
-        print("🔄 Cron job /cron/reminders triggered")
+        logger.info("🔄 Cron job /cron/reminders triggered")
         check_and_send_reminders(app)
-        print("✅ Cron job /cron/reminders completed")
+        # No background workers on Vercel, so deliver what the sweep queued before returning
+        drain_outbox()
+        logger.info("✅ Cron job /cron/reminders completed")
         return 'Reminders checked', 200
 
+    @app.route('/metrics')
+    def metrics():
+        # Bearer token when METRICS_TOKEN is set; a public deployment without one does not expose the endpoint
+        token = os.environ.get('METRICS_TOKEN')
+        if not token and os.environ.get('VERCEL'):
+            return 'Not Found', 404
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return 'Unauthorized', 401
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
     # Register blueprints
     from api.auth import auth_bp
     from api.reminders import reminders_bp
@@ -105,41 +133,34 @@ def create_app():
 
     # Set up background scheduler for email reminders (only for local development, not Vercel)
     if os.environ.get('VERCEL'):
-        print("⚠️ VERCEL environment detected - background scheduler disabled")
+        logger.info("⚠️ VERCEL environment detected - background scheduler disabled")
     else:
-        print("✅ Starting background scheduler for reminders")
+        logger.info("✅ Starting background scheduler for reminders")
         try:
             scheduler = BackgroundScheduler(executors={
                 'default': ThreadPoolExecutor(20),
                 'processpool': ProcessPoolExecutor(5)
             })
 
-            # Schedule check_and_send_reminders to run every 5 minutes
-            scheduler.add_job(
-                func=check_and_send_reminders,
-                args=[app],
-                trigger=IntervalTrigger(minutes=5),
-                id='check_reminders',
-                name='Check and send due reminders',
-                replace_existing=True
-            )
+            # Sweep when the next reminder is due (REMINDER_SCHEDULER_MODE=interval for fixed polling)
+            reminder_scheduler = start_reminder_scheduler(app, scheduler)
+            start_outbox_poller(scheduler)
 
             # Start the scheduler
             scheduler.start()
-            print("✅ Background scheduler started - will check reminders every 5 minutes")
+            if reminder_scheduler:
+                logger.info("✅ Background scheduler started - sweeping at due times, safety poll every %s minutes",
+                            reminder_scheduler.safety_poll_minutes)
+            else:
+                logger.info("✅ Background scheduler started - polling reminders at a fixed interval")
 
             # Shut down the scheduler when exiting the app
             import atexit
             atexit.register(lambda: scheduler.shutdown())
         except Exception as e:
-            import traceback
-            print("❌ Failed to start background scheduler:", e)
-            traceback.print_exc()
+            logger.exception("❌ Failed to start background scheduler: %s", e)
 
     return app
 
 # For Vercel deployment
 app = create_app()
-
-# For Vercel deployment
-app = create_app()
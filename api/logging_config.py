@@ -0,0 +1,117 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+
+# Attributes every LogRecord has; anything else on a record came from `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'sampled'}
+
+class StructuredFormatter(logging.Formatter):
+    """One line per record: 'time level logger message key=value ...' or a JSON object
+
+    Fields passed with `extra={...}` are appended as structured fields.
+    """
+
+    def __init__(self, json_lines=False):
+        super().__init__()
+        self.json_lines = json_lines
+
+    def format(self, record):
+        fields = {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+        if self.json_lines:
+            entry = {
+                'time': self.formatTime(record),
+                'level': record.levelname,
+                'logger': record.name,
+                'message': record.getMessage(),
+            }
+            entry.update(fields)
+            if record.exc_info:
+                entry['exc_info'] = self.formatException(record.exc_info)
+            return json.dumps(entry, default=str, ensure_ascii=False)
+
+        line = f"{self.formatTime(record)} {record.levelname:<7} {record.name}: {record.getMessage()}"
+        if fields:
+            line += ' ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+class SamplingFilter(logging.Filter):
+    """Keeps 1 in `rate` records logged with extra={'sampled': True}, counted per message template
+
+    Per-item messages (one per reminder or CSV row) are marked sampled so a
+    large batch logs a representative trickle instead of every item.
+    """
+
+    def __init__(self, rate=100):
+        super().__init__()
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._seen = {}
+
+    def filter(self, record):
+        if not getattr(record, 'sampled', False) or self.rate <= 1:
+            return True
+        key = (record.name, record.msg)
+        with self._lock:
+            seen = self._seen.get(key, 0)
+            self._seen[key] = seen + 1
+        if seen % self.rate:
+            return False
+        record.sample_rate = self.rate
+        return True
+
+_listener = None
+_queue_handler = None
+_configure_lock = threading.Lock()
+
+def configure_logging():
+    """Route all logging through a queue to a background writer thread (safe to call repeatedly)
+
+    LOG_LEVEL (INFO), LOG_FORMAT ('text' or 'json') and LOG_SAMPLE_RATE (100)
+    come from the environment.
+    """
+    global _listener, _queue_handler
+    with _configure_lock:
+        if _listener is not None:
+            return
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(StructuredFormatter(os.environ.get('LOG_FORMAT', 'text').lower() == 'json'))
+
+        # Callers only enqueue the record; formatting and the write happen on the listener thread
+        queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+        queue_handler.addFilter(SamplingFilter(int(os.environ.get('LOG_SAMPLE_RATE', '100'))))
+
+        root = logging.getLogger()
+        root.handlers = [queue_handler]
+        root.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+
+        _queue_handler = queue_handler
+        _listener = logging.handlers.QueueListener(queue_handler.queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        # Flush what is still queued when the process exits
+        atexit.register(_stop_listener)
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+def _restart_after_fork():
+    # The listener thread does not survive fork() (e.g. gunicorn --preload); without
+    # a new one the child's records pile up in a queue that nothing drains. Records
+    # the parent had not written yet stay with the parent.
+    global _listener, _configure_lock
+    _configure_lock = threading.Lock()
+    if _listener is None:
+        return
+    _queue_handler.queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)
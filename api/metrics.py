@@ -0,0 +1,207 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from a fast SMTP command to a slow sweep
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# How late a reminder went out compared to its reminder_time
+LAG_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 14400)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(values.items())]
+
+class Gauge(_Metric):
+    """A value that goes up and down; can also be computed at scrape time with set_function"""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function):
+        """function() returns a number, or a dict of label-value tuples to numbers"""
+        self._function = function
+
+    def _samples(self):
+        if self._function is not None:
+            try:
+                result = self._function()
+            except Exception as e:
+                logger.warning("⚠️ Failed to compute metric %s: %s", self.name, e)
+                return []
+            values = result if isinstance(result, dict) else {(): result}
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(values.items())]
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+            counts = state[0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            state[1] += 1
+            state[2] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        with self._lock:
+            values = {key: (list(state[0]), state[1], state[2]) for key, state in self._values.items()}
+        lines = []
+        for key, (counts, count, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_count{labels} {count}")
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = MetricsRegistry()
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+def gauge(name, documentation, labelnames=()):
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+def render_metrics():
+    return REGISTRY.render()
+
+# Reminder pipeline (counts are per process; Prometheus sums them across workers)
+SWEEP_DURATION = histogram(
+    'reminder_sweep_duration_seconds', 'Time spent leasing due reminders and queueing them', ['mode']
+)
+REMINDERS_SCANNED = counter('reminders_scanned_total', 'Due reminders read by lease queries')
+REMINDERS_DUE = counter('reminders_due_total', 'Due reminders leased by this process')
+REMINDERS_QUEUED = counter('reminders_queued_total', 'Due reminders queued in the outbox')
+REMINDERS_SKIPPED = counter('reminders_skipped_total', 'Due reminders that could not be queued', ['reason'])
+REMINDERS_SENT = counter('reminders_sent_total', 'Reminder emails accepted by the mail provider')
+REMINDERS_FAILED = counter('reminders_failed_total', 'Reminder email delivery attempts that failed')
+REMINDER_DELIVERY_LAG = histogram(
+    'reminder_delivery_lag_seconds', 'Time from reminder_time until the email was sent', buckets=LAG_BUCKETS
+)
+UPCOMING_REMINDERS = gauge('upcoming_reminders_tracked', 'Reminders held in the in-memory dispatch heap')
+
+# Outbox
+OUTBOX_JOBS = counter('outbox_jobs_total', 'Outbox job outcomes (sent, retry, dead, deferred)', ['kind', 'outcome'])
+OUTBOX_QUEUE_DEPTH = gauge('outbox_queue_depth', 'Outbox jobs by status', ['status'])
+OUTBOX_DRAIN_DURATION = histogram('outbox_drain_duration_seconds', 'Time spent draining the outbox')
+
+# SMTP
+SMTP_CONNECT_SECONDS = histogram('smtp_connect_seconds', 'SMTP connect and STARTTLS latency', ['backend'])
+SMTP_LOGIN_SECONDS = histogram('smtp_login_seconds', 'SMTP login latency', ['backend'])
+SMTP_SEND_SECONDS = histogram('smtp_send_seconds', 'SMTP sendmail latency per message', ['backend'])
+SMTP_ERRORS = counter('smtp_errors_total', 'SMTP failures by stage', ['backend', 'stage'])
+
+# User cache
+USER_CACHE_LOOKUPS = counter(
+    'user_cache_lookups_total', 'get_user_by_id lookups by where they were answered (request, hit, miss)', ['result']
+)
+USER_CACHE_ENTRIES = gauge('user_cache_entries', 'User documents held in the per-process cache')
+
+# MongoDB connection pool
+MONGO_POOL_CONNECTIONS = gauge('mongo_pool_connections', 'MongoDB pool connections by state', ['state'])
+MONGO_POOL_EVENTS = counter('mongo_pool_events_total', 'MongoDB connection pool events', ['event'])
@@ -0,0 +1,195 @@
+import os
+import threading
+from urllib.parse import parse_qsl
+
+from pymongo import MongoClient, monitoring
+
+from api.metrics import MONGO_POOL_CONNECTIONS, MONGO_POOL_EVENTS
+
+def _flag(value):
+    return value.lower() in ['true', '1', 't']
+
+# (MongoClient option, environment variable, default, converter); a None default leaves pymongo's own
+_CLIENT_OPTIONS = [
+    ('maxPoolSize', 'MONGO_MAX_POOL_SIZE', '50', int),
+    ('minPoolSize', 'MONGO_MIN_POOL_SIZE', '0', int),
+    ('maxIdleTimeMS', 'MONGO_MAX_IDLE_TIME_MS', '300000', int),
+    # Fail fast instead of pymongo's 30s default when the server is unreachable
+    ('serverSelectionTimeoutMS', 'MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000', int),
+    ('connectTimeoutMS', 'MONGO_CONNECT_TIMEOUT_MS', '5000', int),
+    ('socketTimeoutMS', 'MONGO_SOCKET_TIMEOUT_MS', '30000', int),
+    ('retryWrites', 'MONGO_RETRY_WRITES', 'true', _flag),
+    ('retryReads', 'MONGO_RETRY_READS', 'true', _flag),
+    ('appname', 'MONGO_APP_NAME', 'reminder-app', str),
+    # e.g. "zstd,zlib"; zstd and snappy need their optional Python packages
+    ('compressors', 'MONGO_COMPRESSORS', None, str),
+    ('readPreference', 'MONGO_READ_PREFERENCE', None, str),
+]
+
+def mongo_uri():
+    return os.environ.get('MONGO_URI', 'mongodb://localhost:27017/')
+
+def _uri_option_names(uri):
+    # URI option names are case-insensitive; only the query string is needed, so no SRV lookup happens
+    return {name.lower() for name, _ in parse_qsl(uri.partition('?')[2])}
+
+def mongo_client_options(uri=None):
+    """MongoClient keyword arguments
+
+    A MONGO_* variable that is set wins; otherwise an option given in MONGO_URI
+    is left to the URI, and the app default applies only when neither sets it.
+    """
+    in_uri = _uri_option_names(mongo_uri() if uri is None else uri)
+    options = {}
+    for name, env_var, default, convert in _CLIENT_OPTIONS:
+        value = os.environ.get(env_var)
+        if value is None:
+            if default is None or name.lower() in in_uri:
+                continue
+            value = default
+        options[name] = convert(value)
+    return options
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Counts connection pool events for pool_stats() and the metrics endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.checked_out = 0
+
+    def _event(self, name, open_delta=0, checked_out_delta=0):
+        MONGO_POOL_EVENTS.inc(event=name)
+        with self._lock:
+            self.open += open_delta
+            self.checked_out += checked_out_delta
+
+    def connection_created(self, event):
+        self._event('created', open_delta=1)
+
+    def connection_closed(self, event):
+        self._event('closed', open_delta=-1)
+
+    def connection_checked_out(self, event):
+        self._event('checked_out', checked_out_delta=1)
+
+    def connection_checked_in(self, event):
+        self._event('checked_in', checked_out_delta=-1)
+
+    def connection_check_out_failed(self, event):
+        self._event('check_out_failed')
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._event('pool_cleared')
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+_client = None
+_client_lock = threading.Lock()
+_pool_listener = PoolStatsListener()
+MONGO_POOL_CONNECTIONS.set_function(lambda: {
+    ('open',): _pool_listener.open,
+    ('checked_out',): _pool_listener.checked_out,
+})
+
+def get_client():
+    """Return the process-wide MongoClient, created on first use
+
+    Nothing connects at import time, so scripts and cold starts that never
+    touch the database pay nothing, and MONGO_URI is read after .env loads.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                uri = mongo_uri()
+                _client = MongoClient(
+                    uri,
+                    connect=False,
+                    event_listeners=[_pool_listener],
+                    **mongo_client_options(uri)
+                )
+    return _client
+
+def close_client():
+    """Close the pooled connections; the next get_client() starts a new client"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+def pool_stats():
+    """Open and checked-out connections in this process's pool, plus the configured limits"""
+    # The effective limits, whether they came from MONGO_URI, the environment or the defaults
+    pool_options = get_client().options.pool_options
+    return {
+        'open': _pool_listener.open,
+        'checked_out': _pool_listener.checked_out,
+        'max_pool_size': pool_options.max_pool_size,
+        'min_pool_size': pool_options.min_pool_size,
+    }
+
+def _reset_after_fork():
+    # A client must not be shared across fork (e.g. gunicorn --preload): the child
+    # drops the parent's client without closing its sockets and connects on first use
+    global _client, _client_lock
+    _client = None
+    _client_lock = threading.Lock()
+    _pool_listener.open = 0
+    _pool_listener.checked_out = 0
+    _pool_listener._lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+class LazyDatabase:
+    """Stands in for a pymongo Database, resolving the client on first use"""
+
+    def __init__(self, name):
+        self._name = name
+        self._client = None
+        self._database = None
+
+    def resolve(self):
+        client = get_client()
+        # Re-resolved only when the client changes (first use, close_client, fork)
+        if client is not self._client:
+            self._database = client[self._name]
+            self._client = client
+        return self._database
+
+    def __getitem__(self, collection_name):
+        return self.resolve()[collection_name]
+
+    def __getattr__(self, attr):
+        return getattr(self.resolve(), attr)
+
+class LazyCollection:
+    """Stands in for a pymongo Collection, resolving the client on first use"""
+
+    def __init__(self, database, name):
+        self._lazy_database = database
+        self._name = name
+        self._database = None
+        self._collection = None
+
+    def __getattr__(self, attr):
+        database = self._lazy_database.resolve()
+        if database is not self._database:
+            self._collection = database[self._name]
+            self._database = database
+        return getattr(self._collection, attr)
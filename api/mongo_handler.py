@@ -1,15 +1,159 @@
+from flask import g, has_request_context
 from werkzeug.security import generate_password_hash, check_password_hash
-from pymongo import MongoClient
+from pymongo import ASCENDING, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
 import os
+import re
 import uuid
 import datetime
 
-# MongoDB connection
-MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/')
-client = MongoClient(MONGO_URI)
-db = client['reminder_app']
-users_collection = db['users']
-reminders_collection = db['reminders']
+from api.mongo_client import LazyCollection, LazyDatabase
+from api.upcoming import UpcomingReminders
+from api.user_cache import UserCache
+from api.metrics import REMINDERS_SCANNED, USER_CACHE_LOOKUPS, USER_CACHE_ENTRIES
+
+# MongoDB connection; see api/mongo_client.py. Nothing connects until the first query.
+db = LazyDatabase('reminder_app')
+users_collection = LazyCollection(db, 'users')
+reminders_collection = LazyCollection(db, 'reminders')
+outbox_collection = LazyCollection(db, 'outbox')
+rate_limits_collection = LazyCollection(db, 'rate_limits')
+reminder_stats_collection = LazyCollection(db, 'reminder_stats')
+
+# Reminders due within the lookahead window, for dispatch without querying.
+# Stays empty until the scheduler calls refresh_upcoming_reminders().
+upcoming_reminders = UpcomingReminders(int(os.environ.get('REMINDER_LOOKAHEAD_SECONDS', '900')))
+
+# User documents by id, so authenticated requests rarely read the users collection
+user_cache = UserCache(
+    int(os.environ.get('USER_CACHE_SIZE', '10000')),
+    int(os.environ.get('USER_CACHE_TTL_SECONDS', '30'))
+)
+USER_CACHE_ENTRIES.set_function(lambda: len(user_cache))
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=user_cache.reset_after_fork)
+
+# Legacy string format of reminder_time; new writes store a native datetime
+REMINDER_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Fields the reminder sender needs from a due reminder
+DUE_REMINDER_PROJECTION = {
+    '_id': 0,
+    'id': 1,
+    'user_id': 1,
+    'title': 1,
+    'description': 1,
+    'reminder_time': 1,
+    'recipient_email': 1,
+}
+
+# Fields the reminder sender needs from a reminder's owner
+SENDER_USER_PROJECTION = {
+    '_id': 0,
+    'id': 1,
+    'email': 1,
+    'email_credentials': 1,
+    'app_password': 1,
+}
+
+# Every index the app relies on, as (collection, keys, options). Unique ones
+# also enforce the invariant in their comment.
+INDEXES = [
+    # Login and signup look users up by email; one account per address
+    ('users', [('email', ASCENDING)], {'name': 'user_email', 'unique': True}),
+    # load_user on every authenticated request, get_users_by_ids; user ids are uuid4 strings
+    ('users', [('id', ASCENDING)], {'name': 'user_id', 'unique': True}),
+    # reset_password finds the user holding a reset token
+    ('users', [('reset_token', ASCENDING)], {'name': 'user_reset_token'}),
+    # Backs lease_due_reminders' sweep query (_due_query): equality on is_completed,
+    # range on reminder_time; the deleted, failed and lease conditions are filtered on the fetched documents
+    ('reminders', [('is_completed', ASCENDING), ('reminder_time', ASCENDING)], {'name': 'due_reminders'}),
+    # Backs upsert_reminders: a CSV import matches existing reminders on title and time
+    ('reminders', [('user_id', ASCENDING), ('title', ASCENDING), ('reminder_time', ASCENDING)],
+     {'name': 'user_reminder_key'}),
+    # Backs list_reminders_page: one user's reminders in (reminder_time, id) order
+    ('reminders', [('user_id', ASCENDING), ('reminder_time', ASCENDING), ('id', ASCENDING)],
+     {'name': 'user_reminders_page'}),
+    # Recycle bin listing and emptying, delete_all_reminders_by_user
+    ('reminders', [('user_id', ASCENDING), ('is_deleted', ASCENDING)], {'name': 'user_deleted_reminders'}),
+    # Backs get_reminder_by_id and the sweep's claim/outcome updates
+    ('reminders', [('id', ASCENDING)], {'name': 'reminder_id', 'unique': True}),
+    # Backs lease_outbox_jobs: ready jobs by status and due time
+    ('outbox', [('status', ASCENDING), ('next_attempt_at', ASCENDING)], {'name': 'outbox_ready'}),
+    ('outbox', [('id', ASCENDING)], {'name': 'outbox_id', 'unique': True}),
+    # A reminder occurrence is enqueued at most once even if its lease is reclaimed
+    ('outbox', [('dedupe_key', ASCENDING)], {
+        'name': 'outbox_dedupe',
+        'unique': True,
+        'partialFilterExpression': {'dedupe_key': {'$type': 'string'}},
+    }),
+    # Sent and dead jobs expire OUTBOX_RETENTION_DAYS after finished_at. The window must outlast the
+    # reminder lease (REMINDER_LEASE_SECONDS) that dedupe_key guards against re-enqueueing within
+    ('outbox', [('finished_at', ASCENDING)], {
+        'name': 'outbox_finished_ttl',
+        'expireAfterSeconds': int(os.environ.get('OUTBOX_RETENTION_DAYS', '7')) * 86400,
+    }),
+    # One token bucket document per key; also makes concurrent first upserts safe
+    ('rate_limits', [('key', ASCENDING)], {'name': 'rate_limit_key', 'unique': True}),
+    # One counters document per user, read by get_reminder_stats
+    ('reminder_stats', [('user_id', ASCENDING)], {'name': 'reminder_stats_user', 'unique': True}),
+]
+
+def ensure_indexes():
+    """Create the declared indexes (safe to call repeatedly); returns [(name, error)] for any that failed"""
+    failed = []
+    for collection_name, keys, options in INDEXES:
+        try:
+            db[collection_name].create_index(keys, **options)
+        except OperationFailure as e:
+            # e.g. existing duplicate emails block the unique index; keep creating the rest
+            failed.append((options['name'], str(e)))
+    # Jobs finished before finished_at existed would never expire; date them from their last update
+    outbox_collection.update_many(
+        {'status': {'$in': [OUTBOX_SENT, OUTBOX_DEAD]}, 'finished_at': {'$exists': False}},
+        [{'$set': {'finished_at': '$updated_at'}}]
+    )
+    return failed
+
+def hot_queries(now=None):
+    """(name, collection, filter, sort) for each query on a hot path, with sample values"""
+    now = now or datetime.datetime.now()
+    sample_id = '00000000-0000-0000-0000-000000000000'
+    return [
+        ('login and signup', 'users', {'email': 'someone@example.com'}, None),
+        ('load_user', 'users', {'id': sample_id}, None),
+        ('reset_password', 'users', {'reset_token': sample_id}, None),
+        ('reminder sweep', 'reminders', {'$and': [_due_query(now), _unleased_query(now)]}, None),
+        ('dashboard page', 'reminders', {'user_id': sample_id, 'is_deleted': {'$ne': True}},
+         [('reminder_time', ASCENDING), ('id', ASCENDING)]),
+        ('recycle bin', 'reminders', {'user_id': sample_id, 'is_deleted': True}, None),
+        ('reminder by id', 'reminders', {'id': sample_id}, None),
+        ('outbox lease', 'outbox', {'status': OUTBOX_PENDING, 'next_attempt_at': {'$lte': now}}, None),
+        ('reminder stats', 'reminder_stats', {'user_id': sample_id}, None),
+    ]
+
+def _plan_stages(plan):
+    # Every 'stage' in an explain() plan tree, whatever the server version nests it under
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _plan_stages(value)
+
+def find_collection_scans():
+    """Explain every hot query and return [(name, stages)] for those whose winning plan is a COLLSCAN"""
+    scans = []
+    for name, collection_name, query, sort in hot_queries():
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        stages = list(_plan_stages(cursor.explain()['queryPlanner']['winningPlan']))
+        if 'COLLSCAN' in stages:
+            scans.append((name, stages))
+    return scans
 
 def read_users():
     return list(users_collection.find())
@@ -42,14 +186,58 @@ def add_user(email, password):
 def get_user_by_email(email):
     return users_collection.find_one({'email': email})
 
+def _request_user_memo():
+    # Users already loaded during this request (None outside a request)
+    if not has_request_context():
+        return None
+    if '_user_memo' not in g:
+        g._user_memo = {}
+    return g._user_memo
+
 def get_user_by_id(user_id):
-    return users_collection.find_one({'id': user_id})
+    """Return a user document from the request memo, the process cache, or MongoDB"""
+    memo = _request_user_memo()
+    if memo is not None and user_id in memo:
+        USER_CACHE_LOOKUPS.inc(result='request')
+        return memo[user_id]
+
+    user = user_cache.get(user_id)
+    if user is not None:
+        USER_CACHE_LOOKUPS.inc(result='hit')
+    else:
+        USER_CACHE_LOOKUPS.inc(result='miss')
+        generation = user_cache.generation
+        user = users_collection.find_one({'id': user_id})
+        if user is not None:
+            user_cache.put(user_id, user, generation)
+    if memo is not None and user is not None:
+        memo[user_id] = user
+    return user
+
+def invalidate_cached_user(user_id=None):
+    """Drop a user (or everyone) from the process cache and the current request's memo"""
+    user_cache.invalidate(user_id)
+    memo = _request_user_memo()
+    if memo is not None:
+        if user_id is None:
+            memo.clear()
+        else:
+            memo.pop(user_id, None)
+
+def get_users_by_ids(user_ids, projection=None):
+    """Fetch many users in one query, returned as a dict keyed by user id"""
+    user_ids = list(set(user_ids))
+    if not user_ids:
+        return {}
+    cursor = users_collection.find({'id': {'$in': user_ids}}, projection or SENDER_USER_PROJECTION)
+    return {user['id']: user for user in cursor}
 
 def update_user_password(user_id, new_password_hash):
     result = users_collection.update_one(
         {'id': user_id},
         {'$set': {'password_hash': new_password_hash}}
     )
+    invalidate_cached_user(user_id)
     return result.modified_count > 0
 
 def update_user_profile_picture(user_id, filename):
@@ -57,6 +245,7 @@ def update_user_profile_picture(user_id, filename):
         {'id': user_id},
         {'$set': {'profile_picture': filename}}
     )
+    invalidate_cached_user(user_id)
     return result.modified_count > 0
 
 def update_user_bio(user_id, bio):
@@ -64,6 +253,7 @@ def update_user_bio(user_id, bio):
         {'id': user_id},
         {'$set': {'bio': bio}}
     )
+    invalidate_cached_user(user_id)
     return result.modified_count > 0
 
 def update_user_email_credentials(user_id, email, app_password):
@@ -71,6 +261,7 @@ def update_user_email_credentials(user_id, email, app_password):
         {'id': user_id},
         {'$set': {'email_credentials': email, 'app_password': app_password}}
     )
+    invalidate_cached_user(user_id)
     return result.modified_count > 0
 
 def update_user_reminder_email(user_id, email):
@@ -78,6 +269,7 @@ def update_user_reminder_email(user_id, email):
         {'id': user_id},
         {'$set': {'reminder_email': email}}
     )
+    invalidate_cached_user(user_id)
     return result.modified_count > 0
 
 def update_user_reminder_app_password(user_id, app_password):
@@ -85,6 +277,7 @@ def update_user_reminder_app_password(user_id, app_password):
         {'id': user_id},
         {'$set': {'reminder_app_password': app_password}}
     )
+    invalidate_cached_user(user_id)
     return result.modified_count > 0
 
 def verify_password(password, password_hash):
@@ -108,25 +301,232 @@ def set_reset_token(user_id, token, expiry):
         {'id': user_id},
         {'$set': {'reset_token': token, 'reset_token_expiry': str(expiry)}}
     )
+    invalidate_cached_user(user_id)
     return result.modified_count > 0
 
 def reset_password(token, new_password):
-    result = users_collection.update_one(
+    user = users_collection.find_one_and_update(
         {'reset_token': token},
-        {'$set': {'password_hash': generate_password_hash(new_password), 'reset_token': '', 'reset_token_expiry': ''}}
+        {'$set': {'password_hash': generate_password_hash(new_password), 'reset_token': '', 'reset_token_expiry': ''}},
+        projection={'_id': 0, 'id': 1}
     )
-    return result.modified_count > 0
+    if user is None:
+        return False
+    invalidate_cached_user(user['id'])
+    return True
 
 # Reminder functions
+def parse_reminder_time(value):
+    """Return reminder_time as a datetime, accepting legacy string values"""
+    if isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, str):
+        return datetime.datetime.strptime(value, REMINDER_TIME_FORMAT)
+    raise ValueError(f"Invalid reminder time: {value!r}")
+
 def get_all_reminders():
     return list(reminders_collection.find())
 
+def _due_query(now):
+    # Until scripts/backfill_reminder_times.py has run, older reminders may
+    # still hold the sortable legacy string; range-match both representations
+    return {
+        'is_completed': False,
+        'is_deleted': {'$ne': True},
+        # Given up on after the outbox ran out of attempts; editing the reminder clears it
+        'delivery_failed': {'$ne': True},
+        '$or': [
+            {'reminder_time': {'$lte': now}},
+            {'reminder_time': {'$lte': now.strftime(REMINDER_TIME_FORMAT)}},
+        ],
+    }
+
+def _unleased_query(now):
+    # Never leased, released, or the holder's lease has run out
+    return {'$or': [{'lease_expires_at': None}, {'lease_expires_at': {'$lte': now}}]}
+
+def get_next_reminder_time(now=None):
+    """Return the earliest reminder_time among pending reminders, or None"""
+    now = now or datetime.datetime.now()
+    earliest = None
+    # Dates and legacy strings sort separately in MongoDB, so ask for each
+    for bson_type in ('date', 'string'):
+        query = {
+            '$and': [
+                {'is_completed': False, 'is_deleted': {'$ne': True}, 'delivery_failed': {'$ne': True},
+                 'reminder_time': {'$type': bson_type}},
+                _unleased_query(now),
+            ]
+        }
+        reminder = reminders_collection.find_one(
+            query, {'_id': 0, 'reminder_time': 1}, sort=[('reminder_time', ASCENDING)]
+        )
+        if not reminder:
+            continue
+        try:
+            reminder_time = parse_reminder_time(reminder['reminder_time'])
+        except ValueError:
+            continue
+        if earliest is None or reminder_time < earliest:
+            earliest = reminder_time
+    return earliest
+
+def _load_upcoming(after, until):
+    query = {
+        'is_completed': False,
+        'is_deleted': {'$ne': True},
+        'delivery_failed': {'$ne': True},
+        '$or': [
+            {'reminder_time': {'$lte': until}},
+            {'reminder_time': {'$lte': until.strftime(REMINDER_TIME_FORMAT)}},
+        ],
+    }
+    if after is not None:
+        query['$or'][0]['reminder_time']['$gt'] = after
+        query['$or'][1]['reminder_time']['$gt'] = after.strftime(REMINDER_TIME_FORMAT)
+    projection = {'_id': 0, 'id': 1, 'user_id': 1, 'reminder_time': 1, 'lease_expires_at': 1}
+    for reminder in reminders_collection.find(query, projection):
+        due_at = _effective_due_time(reminder)
+        if due_at is not None and due_at <= until:
+            yield reminder['id'], reminder['user_id'], due_at
+
+def _effective_due_time(reminder):
+    # A leased (or failed and held back) reminder cannot go out before its lease expires
+    try:
+        due_at = parse_reminder_time(reminder['reminder_time'])
+    except ValueError:
+        return None
+    lease_expires_at = reminder.get('lease_expires_at')
+    if lease_expires_at and lease_expires_at > due_at:
+        due_at = lease_expires_at
+    return due_at
+
+def refresh_upcoming_reminders(now=None):
+    """Extend the in-memory upcoming-reminder window, loading only the new slice"""
+    return upcoming_reminders.refresh(now or datetime.datetime.now(), _load_upcoming)
+
+UPCOMING_SYNC_PROJECTION = {
+    '_id': 0, 'id': 1, 'user_id': 1, 'reminder_time': 1, 'is_completed': 1, 'is_deleted': 1, 'lease_expires_at': 1,
+    'delivery_failed': 1,
+}
+
+def _track_upcoming(reminder_id):
+    # Re-sync one reminder into the in-memory window after a change
+    track_upcoming_reminders([reminder_id])
+
+def track_upcoming_reminders(reminder_ids):
+    """Re-read reminders into the in-memory window, e.g. after a lease failed, was lost or expired"""
+    reminder_ids = [str(reminder_id) for reminder_id in reminder_ids]
+    if upcoming_reminders.horizon is None or not reminder_ids:
+        return
+    found = set()
+    for reminder in reminders_collection.find({'id': {'$in': reminder_ids}}, UPCOMING_SYNC_PROJECTION):
+        found.add(reminder['id'])
+        _sync_upcoming(reminder)
+    for reminder_id in reminder_ids:
+        if reminder_id not in found:
+            upcoming_reminders.remove(reminder_id)
+
+def _sync_upcoming(reminder):
+    reminder_id = reminder['id']
+    if reminder.get('is_completed') is not False or reminder.get('is_deleted') or reminder.get('delivery_failed'):
+        upcoming_reminders.remove(reminder_id)
+        return
+    due_at = _effective_due_time(reminder)
+    if due_at is None:
+        upcoming_reminders.remove(reminder_id)
+    else:
+        upcoming_reminders.upsert(reminder_id, reminder['user_id'], due_at)
+
 def mark_reminder_completed(reminder_id, completed=True):
-    result = reminders_collection.update_one(
-        {'id': str(reminder_id)},
-        {'$set': {'is_completed': completed}}
+    # Only a real state change moves the stats counters
+    before = reminders_collection.find_one_and_update(
+        {'id': str(reminder_id), 'is_completed': {'$ne': completed}},
+        {'$set': {'is_completed': completed}},
+        projection=STATS_PROJECTION
     )
-    return result.modified_count > 0
+    if before:
+        _apply_stats_change(before, dict(before, is_completed=completed))
+    if completed:
+        upcoming_reminders.remove(str(reminder_id))
+    else:
+        _track_upcoming(str(reminder_id))
+    return before is not None
+
+def lease_due_reminders(owner, lease_seconds=300, limit=500, now=None, reminder_ids=None):
+    """Atomically lease up to `limit` due reminders to `owner` and return them
+
+    Each reminder is taken by at most one worker at a time. Leases that were
+    not released before lease_expires_at are reclaimed by the next caller.
+    Pass reminder_ids to lease specific reminders (e.g. popped from
+    upcoming_reminders) instead of searching for due ones.
+    """
+    now = now or datetime.datetime.now()
+    if reminder_ids is None:
+        query = {'$and': [_due_query(now), _unleased_query(now)]}
+        candidate_ids = [
+            reminder['id']
+            for reminder in reminders_collection.find(query, {'_id': 0, 'id': 1}).limit(limit)
+        ]
+        REMINDERS_SCANNED.inc(len(candidate_ids))
+    else:
+        candidate_ids = list(reminder_ids)
+    if not candidate_ids:
+        return []
+
+    lease_id = str(uuid.uuid4())
+    # Re-check due and lease conditions per document so concurrent workers cannot both win
+    reminders_collection.update_many(
+        {'$and': [{'id': {'$in': candidate_ids}}, _due_query(now), _unleased_query(now)]},
+        {'$set': {
+            'lease_owner': owner,
+            'lease_id': lease_id,
+            'lease_expires_at': now + datetime.timedelta(seconds=lease_seconds),
+        }}
+    )
+    # lease_id goes back with each reminder so release_reminder_leases can match this lease only
+    return list(reminders_collection.find(
+        {'id': {'$in': candidate_ids}, 'lease_id': lease_id},
+        dict(DUE_REMINDER_PROJECTION, lease_id=1)
+    ))
+
+def release_reminder_leases(lease_ids, queued_ids, failed_ids, retry_delay=300):
+    """Record sweep outcomes in one bulk write and release the leases
+
+    Reminders queued in the outbox are completed. Failed ones stay pending but
+    cannot be leased again for retry_delay seconds, so a failing account is
+    not retried in a tight loop. lease_ids are the leases the caller took
+    with lease_due_reminders.
+    """
+    now = datetime.datetime.now()
+    # Match the lease, not the owner: two overlapping sweeps in one process (the scheduler
+    # and /cron/reminders) share an owner, and a lease that expired may have been re-taken
+    held = {'$in': list(lease_ids)}
+    operations = []
+    completed_by_user = {}
+    if queued_ids:
+        queued_filter = {'id': {'$in': list(queued_ids)}, 'is_completed': False, 'lease_id': held}
+        for reminder in reminders_collection.find(queued_filter, {'_id': 0, 'user_id': 1}):
+            completed_by_user[reminder['user_id']] = completed_by_user.get(reminder['user_id'], 0) + 1
+        operations.append(UpdateMany(
+            queued_filter,
+            {'$set': {'is_completed': True, 'queued_at': now},
+             '$unset': {'lease_owner': '', 'lease_id': '', 'lease_expires_at': ''}}
+        ))
+    if failed_ids:
+        operations.append(UpdateMany(
+            {'id': {'$in': list(failed_ids)}, 'lease_id': held},
+            {'$set': {'lease_expires_at': now + datetime.timedelta(seconds=retry_delay)},
+             '$unset': {'lease_owner': '', 'lease_id': ''}}
+        ))
+    if operations:
+        reminders_collection.bulk_write(operations, ordered=False)
+    for user_id, count in completed_by_user.items():
+        _inc_reminder_stats(user_id, {'completed': count})
+    for reminder_id in queued_ids:
+        upcoming_reminders.remove(reminder_id)
+    # Failed reminders come back due when their retry delay runs out
+    track_upcoming_reminders(failed_ids)
 
 def add_reminder(user_id, title, description, reminder_time, recipient_email):
     reminder_id = str(uuid.uuid4())
@@ -135,15 +535,164 @@ def add_reminder(user_id, title, description, reminder_time, recipient_email):
         'user_id': user_id,
         'title': title,
         'description': description,
-        'reminder_time': reminder_time.strftime('%Y-%m-%d %H:%M:%S'),
+        'reminder_time': parse_reminder_time(reminder_time),
         'recipient_email': recipient_email,
         'is_completed': False
     }
     reminders_collection.insert_one(new_reminder)
+    _apply_stats_change(None, new_reminder)
+    upcoming_reminders.upsert(reminder_id, user_id, new_reminder['reminder_time'])
     return reminder_id
 
-def get_reminders_by_user_id(user_id):
-    return list(reminders_collection.find({'user_id': user_id}))
+def upsert_reminders(user_id, reminders):
+    """Insert or update many reminders in one bulk write, matching on (title, reminder_time)
+
+    reminders are (title, description, reminder_time, recipient_email)
+    tuples; returns (inserted, updated).
+    """
+    operations = []
+    reminder_times = set()
+    for title, description, reminder_time, recipient_email in reminders:
+        reminder_time = parse_reminder_time(reminder_time)
+        reminder_times.add(reminder_time)
+        update = {
+            '$set': {'description': description, 'reminder_time': reminder_time},
+            '$setOnInsert': {'id': str(uuid.uuid4()), 'is_completed': False},
+        }
+        # Like update_reminder, a missing recipient leaves the existing one alone
+        if recipient_email is not None:
+            update['$set']['recipient_email'] = recipient_email
+        else:
+            update['$setOnInsert']['recipient_email'] = None
+        operations.append(UpdateOne(
+            {'user_id': user_id, 'title': title,
+             'reminder_time': {'$in': [reminder_time, reminder_time.strftime(REMINDER_TIME_FORMAT)]}},
+            update,
+            upsert=True
+        ))
+    if not operations:
+        return 0, 0
+    # Ordered, so a title and time repeated within the batch updates the reminder it just created
+    result = reminders_collection.bulk_write(operations, ordered=True)
+    # Which matched reminders changed state is not known here; rebuild the counters on next read
+    invalidate_reminder_stats(user_id)
+
+    # Only reminders inside the in-memory window need re-syncing
+    horizon = upcoming_reminders.horizon
+    if horizon is not None:
+        near_times = [t for t in reminder_times if t <= horizon]
+        if near_times:
+            query = {'user_id': user_id, 'reminder_time': {'$in': near_times}}
+            for reminder in reminders_collection.find(query, UPCOMING_SYNC_PROJECTION):
+                _sync_upcoming(reminder)
+    return result.upserted_count, result.matched_count
+
+# Fields written by the CSV export
+EXPORT_REMINDER_PROJECTION = {
+    '_id': 0,
+    'id': 1,
+    'user_id': 1,
+    'title': 1,
+    'description': 1,
+    'reminder_time': 1,
+    'created_at': 1,
+    'is_completed': 1,
+    'recipient_email': 1,
+    'delivery_failed': 1,
+    'last_error': 1,
+}
+
+def _reminder_time_range(start=None, end=None):
+    # Range-match both the datetime and the legacy string representation
+    native, legacy = {}, {}
+    if start is not None:
+        native['$gte'] = start
+        legacy['$gte'] = start.strftime(REMINDER_TIME_FORMAT)
+    if end is not None:
+        native['$lt'] = end
+        legacy['$lt'] = end.strftime(REMINDER_TIME_FORMAT)
+    return {'$or': [{'reminder_time': native}, {'reminder_time': legacy}]}
+
+def iter_reminders_for_export(user_id, start=None, end=None, completed=None, batch_size=1000):
+    """Cursor over a user's reminders with the export filters applied in the query
+
+    start is inclusive and end exclusive; completed=None returns both states.
+    """
+    query = {'user_id': user_id}
+    if completed is not None:
+        query['is_completed'] = completed
+    if start is not None or end is not None:
+        query.update(_reminder_time_range(start, end))
+    return reminders_collection.find(query, EXPORT_REMINDER_PROJECTION, batch_size=batch_size)
+
+# Fields the dashboard table shows
+LIST_REMINDER_PROJECTION = {
+    '_id': 0,
+    'id': 1,
+    'title': 1,
+    'description': 1,
+    'reminder_time': 1,
+    'created_at': 1,
+    'is_completed': 1,
+    'recipient_email': 1,
+    'delivery_failed': 1,
+    'last_error': 1,
+}
+
+def encode_page_cursor(reminder):
+    """Opaque position after `reminder` in (reminder_time, id) order"""
+    reminder_time = reminder['reminder_time']
+    if isinstance(reminder_time, datetime.datetime):
+        return f"d{reminder_time.isoformat()}|{reminder['id']}"
+    return f"s{reminder_time}|{reminder['id']}"
+
+def decode_page_cursor(token):
+    """Inverse of encode_page_cursor; None for a missing or malformed token (start from the first page)"""
+    if not token:
+        return None
+    value, separator, reminder_id = token[1:].rpartition('|')
+    if not separator or token[:1] not in ('d', 's'):
+        return None
+    if token[0] == 'd':
+        try:
+            value = datetime.datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return value, reminder_id
+
+def list_reminders_page(user_id, after=None, limit=50, completed=None, start=None, end=None, search=None):
+    """One page of a user's live reminders in (reminder_time, id) order
+
+    after is a (reminder_time, id) position from decode_page_cursor. Returns
+    (reminders, next_cursor); next_cursor is None on the last page.
+    """
+    clauses = [{'user_id': user_id, 'is_deleted': {'$ne': True}}]
+    if completed is not None:
+        clauses.append({'is_completed': completed})
+    if start is not None or end is not None:
+        clauses.append(_reminder_time_range(start, end))
+    if search:
+        pattern = {'$regex': re.escape(search), '$options': 'i'}
+        clauses.append({'$or': [{'title': pattern}, {'description': pattern}]})
+    if after is not None:
+        after_time, after_id = after
+        seek = [
+            {'reminder_time': {'$gt': after_time}},
+            {'reminder_time': after_time, 'id': {'$gt': after_id}},
+        ]
+        # Legacy strings sort before datetimes, and $gt on a string only matches strings
+        if not isinstance(after_time, datetime.datetime):
+            seek.append({'reminder_time': {'$type': 'date'}})
+        clauses.append({'$or': seek})
+
+    cursor = reminders_collection.find(
+        {'$and': clauses}, LIST_REMINDER_PROJECTION
+    ).sort([('reminder_time', ASCENDING), ('id', ASCENDING)]).limit(limit + 1)
+    reminders = list(cursor)
+    if len(reminders) > limit:
+        reminders = reminders[:limit]
+        return reminders, encode_page_cursor(reminders[-1])
+    return reminders, None
 
 def get_reminder_by_id(reminder_id):
     return reminders_collection.find_one({'id': reminder_id})
@@ -155,23 +704,35 @@ def update_reminder(reminder_id, title=None, description=None, reminder_time=Non
     if description is not None:
         update_fields['description'] = description
     if reminder_time is not None:
-        update_fields['reminder_time'] = reminder_time.strftime('%Y-%m-%d %H:%M:%S')
+        update_fields['reminder_time'] = parse_reminder_time(reminder_time)
     if recipient_email is not None:
         update_fields['recipient_email'] = recipient_email
     if is_completed is not None:
         update_fields['is_completed'] = is_completed
 
     if update_fields:
-        result = reminders_collection.update_one(
+        update = {'$set': update_fields}
+        if 'reminder_time' in update_fields or 'is_completed' in update_fields:
+            # Rescheduling or re-opening a failed reminder makes it eligible for delivery again
+            update['$unset'] = {'delivery_failed': '', 'last_error': ''}
+        before = reminders_collection.find_one_and_update(
             {'id': reminder_id},
-            {'$set': update_fields}
+            update,
+            projection=dict(STATS_PROJECTION, **{field: 1 for field in update_fields})
         )
-        return result.modified_count > 0
+        if before:
+            _apply_stats_change(before, dict(before, **update_fields))
+        if 'reminder_time' in update_fields or 'is_completed' in update_fields:
+            _track_upcoming(reminder_id)
+        return before is not None and any(before.get(field) != value for field, value in update_fields.items())
     return False
 
 def delete_reminder(reminder_id):
-    result = reminders_collection.delete_one({'id': reminder_id})
-    return result.deleted_count > 0
+    before = reminders_collection.find_one_and_delete({'id': reminder_id}, projection=STATS_PROJECTION)
+    if before:
+        _apply_stats_change(before, None)
+    upcoming_reminders.remove(reminder_id)
+    return before is not None
 
 def delete_all_reminders_by_user(user_id):
     # Soft delete all reminders by marking them as deleted
@@ -179,29 +740,294 @@ def delete_all_reminders_by_user(user_id):
         {'user_id': user_id, 'is_deleted': {'$ne': True}},
         {'$set': {'is_deleted': True, 'deleted_at': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}}
     )
+    # Every live reminder is now in the recycle bin
+    reminder_stats_collection.update_one(
+        {'user_id': user_id},
+        {'$set': {'total': 0, 'completed': 0, 'with_recipient': 0}, '$inc': {'deleted': result.modified_count}}
+    )
+    upcoming_reminders.remove_user(user_id)
     return result.modified_count
 
 def soft_delete_reminder(reminder_id):
-    result = reminders_collection.update_one(
-        {'id': reminder_id},
-        {'$set': {'is_deleted': True, 'deleted_at': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}}
+    before = reminders_collection.find_one_and_update(
+        {'id': reminder_id, 'is_deleted': {'$ne': True}},
+        {'$set': {'is_deleted': True, 'deleted_at': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}},
+        projection=STATS_PROJECTION
     )
-    return result.modified_count > 0
+    if before:
+        _apply_stats_change(before, dict(before, is_deleted=True))
+    upcoming_reminders.remove(reminder_id)
+    return before is not None
 
 def restore_reminder(reminder_id):
-    result = reminders_collection.update_one(
-        {'id': reminder_id},
-        {'$unset': {'is_deleted': '', 'deleted_at': ''}}
+    before = reminders_collection.find_one_and_update(
+        {'id': reminder_id, 'is_deleted': True},
+        {'$unset': {'is_deleted': '', 'deleted_at': ''}},
+        projection=STATS_PROJECTION
     )
-    return result.modified_count > 0
+    if before:
+        _apply_stats_change(before, dict(before, is_deleted=False))
+    _track_upcoming(reminder_id)
+    return before is not None
 
 def get_deleted_reminders_by_user(user_id):
     return list(reminders_collection.find({'user_id': user_id, 'is_deleted': True}))
 
 def permanently_delete_reminder(reminder_id):
-    result = reminders_collection.delete_one({'id': reminder_id})
-    return result.deleted_count > 0
+    before = reminders_collection.find_one_and_delete({'id': reminder_id}, projection=STATS_PROJECTION)
+    if before:
+        _apply_stats_change(before, None)
+    upcoming_reminders.remove(reminder_id)
+    return before is not None
 
 def permanently_delete_all_deleted_reminders(user_id):
     result = reminders_collection.delete_many({'user_id': user_id, 'is_deleted': True})
+    _inc_reminder_stats(user_id, {'deleted': -result.deleted_count})
     return result.deleted_count
+
+# Per-user reminder counters for the dashboard. Writers adjust them with $inc;
+# a missing or old document is rebuilt from one aggregation on read.
+REMINDER_STATS_MAX_AGE = int(os.environ.get('REMINDER_STATS_MAX_AGE', '3600'))
+STATS_PROJECTION = {'_id': 0, 'user_id': 1, 'is_completed': 1, 'is_deleted': 1, 'recipient_email': 1}
+
+def _stats_contribution(reminder):
+    # What one reminder document adds to its owner's counters
+    if reminder is None:
+        return {}
+    if reminder.get('is_deleted'):
+        return {'deleted': 1}
+    return {
+        'total': 1,
+        'completed': 1 if reminder.get('is_completed') is True else 0,
+        'with_recipient': 1 if reminder.get('recipient_email') else 0,
+    }
+
+def _apply_stats_change(before, after):
+    user_id = (after or before)['user_id']
+    old, new = _stats_contribution(before), _stats_contribution(after)
+    _inc_reminder_stats(user_id, {field: new.get(field, 0) - old.get(field, 0) for field in set(old) | set(new)})
+
+def _inc_reminder_stats(user_id, delta):
+    delta = {field: value for field, value in delta.items() if value}
+    if delta:
+        # No upsert: without a document the next read aggregates from scratch
+        reminder_stats_collection.update_one({'user_id': user_id}, {'$inc': delta})
+
+def invalidate_reminder_stats(user_id):
+    """Drop a user's counters so the next get_reminder_stats recomputes them"""
+    reminder_stats_collection.delete_one({'user_id': user_id})
+
+def _compute_reminder_stats(user_id):
+    # One group for live reminders and one for the recycle bin
+    pipeline = [
+        {'$match': {'user_id': user_id}},
+        {'$group': {
+            '_id': {'$eq': ['$is_deleted', True]},
+            'count': {'$sum': 1},
+            'completed': {'$sum': {'$cond': [{'$eq': ['$is_completed', True]}, 1, 0]}},
+            # Missing and null sort below '', so this counts non-empty addresses only
+            'with_recipient': {'$sum': {'$cond': [{'$gt': ['$recipient_email', '']}, 1, 0]}},
+        }},
+    ]
+    stats = {'total': 0, 'completed': 0, 'deleted': 0, 'with_recipient': 0}
+    for group in reminders_collection.aggregate(pipeline):
+        if group['_id']:
+            stats['deleted'] = group['count']
+        else:
+            stats.update(total=group['count'], completed=group['completed'], with_recipient=group['with_recipient'])
+    return stats
+
+def get_reminder_stats(user_id):
+    """Counts of a user's reminders for the dashboard cards, from the counters document"""
+    now = datetime.datetime.now()
+    stats = reminder_stats_collection.find_one({'user_id': user_id}, {'_id': 0})
+    if stats is None or stats['computed_at'] <= now - datetime.timedelta(seconds=REMINDER_STATS_MAX_AGE):
+        # Rebuilding periodically also repairs drift from writes racing a rebuild
+        counts = _compute_reminder_stats(user_id)
+        try:
+            reminder_stats_collection.replace_one(
+                {'user_id': user_id}, dict(counts, user_id=user_id, computed_at=now), upsert=True
+            )
+        except DuplicateKeyError:
+            pass  # A concurrent reader rebuilt the document first
+        stats = counts
+    return {
+        'total': stats['total'],
+        'pending': stats['total'] - stats['completed'],
+        'completed': stats['completed'],
+        'deleted': stats['deleted'],
+        'with_recipient': stats['with_recipient'],
+    }
+
+# Outbox (durable outbound email queue)
+OUTBOX_PENDING = 'pending'
+OUTBOX_SENT = 'sent'
+OUTBOX_DEAD = 'dead'
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', '6'))
+
+def enqueue_outbox_jobs(jobs, max_attempts=OUTBOX_MAX_ATTEMPTS):
+    """Insert delivery jobs; each job is a dict with kind, payload and an optional dedupe_key.
+
+    Returns the ids of the jobs that were queued (duplicates are skipped).
+    """
+    now = datetime.datetime.now()
+    docs = []
+    for job in jobs:
+        doc = {
+            'id': str(uuid.uuid4()),
+            'kind': job['kind'],
+            'payload': job['payload'],
+            'status': OUTBOX_PENDING,
+            'attempts': 0,
+            'max_attempts': job.get('max_attempts', max_attempts),
+            'next_attempt_at': now,
+            'created_at': now,
+            'updated_at': now,
+            'history': [],
+        }
+        if job.get('dedupe_key'):
+            doc['dedupe_key'] = job['dedupe_key']
+        docs.append(doc)
+    if not docs:
+        return []
+    try:
+        outbox_collection.insert_many(docs, ordered=False)
+        return [doc['id'] for doc in docs]
+    except BulkWriteError as e:
+        # Duplicate dedupe_key means the job is already queued; anything else is a real error
+        failed = {error['index'] for error in e.details.get('writeErrors', []) if error.get('code') == 11000}
+        if len(failed) != len(e.details.get('writeErrors', [])):
+            raise
+        return [doc['id'] for index, doc in enumerate(docs) if index not in failed]
+
+def lease_outbox_jobs(owner, lease_seconds=300, limit=200, now=None):
+    """Atomically lease up to `limit` ready outbox jobs to `owner` and return them"""
+    now = now or datetime.datetime.now()
+    ready = {'status': OUTBOX_PENDING, 'next_attempt_at': {'$lte': now}}
+    query = {'$and': [ready, _unleased_query(now)]}
+    candidate_ids = [
+        job['id'] for job in outbox_collection.find(query, {'_id': 0, 'id': 1}).limit(limit)
+    ]
+    if not candidate_ids:
+        return []
+
+    lease_id = str(uuid.uuid4())
+    outbox_collection.update_many(
+        {'$and': [{'id': {'$in': candidate_ids}}, ready, _unleased_query(now)]},
+        {'$set': {
+            'lease_owner': owner,
+            'lease_id': lease_id,
+            'lease_expires_at': now + datetime.timedelta(seconds=lease_seconds),
+        }}
+    )
+    return list(outbox_collection.find(
+        {'id': {'$in': candidate_ids}, 'lease_id': lease_id},
+        {'_id': 0, 'history': 0}
+    ))
+
+def renew_outbox_leases(owner, job_ids, lease_seconds=300):
+    result = outbox_collection.update_many(
+        {'id': {'$in': list(job_ids)}, 'lease_owner': owner, 'status': OUTBOX_PENDING},
+        {'$set': {'lease_expires_at': datetime.datetime.now() + datetime.timedelta(seconds=lease_seconds)}}
+    )
+    return result.modified_count
+
+def record_outbox_results(owner, results, backoff_base=30, backoff_max=3600, history_limit=20):
+    """Record delivery attempts in one bulk write.
+
+    results: list of (job, success, error). Failed jobs are retried with
+    exponential backoff until max_attempts, then moved to the dead state.
+    """
+    now = datetime.datetime.now()
+    operations = []
+    dead_reminders = []
+    for job, success, error in results:
+        attempts = job.get('attempts', 0) + 1
+        entry = {'at': now, 'ok': success, 'error': str(error) if error else None}
+        update = {
+            '$set': {'attempts': attempts, 'updated_at': now},
+            '$unset': {'lease_owner': '', 'lease_id': '', 'lease_expires_at': ''},
+            '$push': {'history': {'$each': [entry], '$slice': -history_limit}},
+        }
+        if success:
+            update['$set'].update({'status': OUTBOX_SENT, 'sent_at': now, 'finished_at': now})
+        elif attempts >= job.get('max_attempts', OUTBOX_MAX_ATTEMPTS):
+            update['$set'].update({'status': OUTBOX_DEAD, 'finished_at': now})
+            if job.get('kind') == 'reminder':
+                dead_reminders.append((job['payload']['reminder_id'], entry['error']))
+        else:
+            delay = min(backoff_max, backoff_base * 2 ** (attempts - 1))
+            update['$set']['next_attempt_at'] = now + datetime.timedelta(seconds=delay)
+        operations.append(UpdateOne({'id': job['id'], 'lease_owner': owner}, update))
+    if operations:
+        outbox_collection.bulk_write(operations, ordered=False)
+    for reminder_id, error in dead_reminders:
+        mark_reminder_delivery_failed(reminder_id, error)
+
+def mark_reminder_delivery_failed(reminder_id, error):
+    """Record that a queued reminder was never delivered; it was marked completed when it was queued"""
+    before = reminders_collection.find_one_and_update(
+        {'id': reminder_id},
+        {'$set': {'is_completed': False, 'delivery_failed': True, 'last_error': error,
+                  'failed_at': datetime.datetime.now()}},
+        projection=STATS_PROJECTION
+    )
+    if before:
+        _apply_stats_change(before, dict(before, is_completed=False))
+
+def defer_outbox_jobs(owner, job_ids, retry_at):
+    """Put leased jobs back to wait until retry_at without counting a delivery attempt"""
+    if not job_ids:
+        return 0
+    result = outbox_collection.update_many(
+        {'id': {'$in': list(job_ids)}, 'lease_owner': owner},
+        {
+            '$set': {'next_attempt_at': retry_at, 'updated_at': datetime.datetime.now()},
+            '$inc': {'deferrals': 1},
+            '$unset': {'lease_owner': '', 'lease_id': '', 'lease_expires_at': ''},
+        }
+    )
+    return result.modified_count
+
+def get_outbox_job(job_id):
+    return outbox_collection.find_one({'id': job_id}, {'_id': 0})
+
+def count_outbox_jobs(status=OUTBOX_PENDING):
+    return outbox_collection.count_documents({'status': status})
+
+# Token buckets shared by every process (rate limiting outbound mail)
+def take_rate_tokens(key, capacity, per_second, requested):
+    """Refill the bucket for elapsed time and take up to `requested` whole tokens, atomically.
+
+    Uses the server clock ($$NOW) so processes with skewed clocks agree.
+    Returns (granted, tokens_left).
+    """
+    elapsed = {'$divide': [{'$subtract': ['$$NOW', {'$ifNull': ['$updated_at', '$$NOW']}]}, 1000]}
+    refilled = {'$add': [{'$ifNull': ['$tokens', capacity]}, {'$multiply': [elapsed, per_second]}]}
+    pipeline = [
+        {'$set': {'tokens': {'$min': [capacity, refilled]}, 'updated_at': '$$NOW'}},
+        {'$set': {'granted': {'$max': [0, {'$min': [requested, {'$floor': '$tokens'}]}]}}},
+        {'$set': {'tokens': {'$subtract': ['$tokens', '$granted']}}},
+    ]
+    for attempt in range(2):
+        try:
+            bucket = rate_limits_collection.find_one_and_update(
+                {'key': key}, pipeline, upsert=True,
+                projection={'_id': 0, 'granted': 1, 'tokens': 1},
+                return_document=ReturnDocument.AFTER
+            )
+            return int(bucket['granted']), bucket['tokens']
+        except DuplicateKeyError:
+            # Another process created the bucket first; the retry updates it
+            if attempt:
+                raise
+
+def return_rate_tokens(key, capacity, count):
+    """Give back tokens that were taken but not used"""
+    if count <= 0:
+        return
+    rate_limits_collection.update_one(
+        {'key': key},
+        [{'$set': {'tokens': {'$min': [capacity, {'$add': ['$tokens', count]}]}}}]
+    )
+
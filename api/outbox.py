@@ -0,0 +1,213 @@
+import concurrent.futures
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from api.mongo_handler import (
+    enqueue_outbox_jobs, lease_outbox_jobs, renew_outbox_leases, record_outbox_results, defer_outbox_jobs,
+    get_users_by_ids, parse_reminder_time, count_outbox_jobs, OUTBOX_PENDING, OUTBOX_DEAD, OUTBOX_MAX_ATTEMPTS
+)
+from api.rate_limiter import get_rate_limiter
+from api.metrics import OUTBOX_JOBS, OUTBOX_QUEUE_DEPTH, OUTBOX_DRAIN_DURATION
+
+logger = logging.getLogger(__name__)
+
+def enqueue_email(kind, payload, dedupe_key=None, max_attempts=None):
+    """Queue one email for the delivery workers and wake them; returns the job id (None if a duplicate)"""
+    job = {'kind': kind, 'payload': payload, 'dedupe_key': dedupe_key}
+    if max_attempts:
+        job['max_attempts'] = max_attempts
+    job_ids = enqueue_outbox_jobs([job])
+    wake_delivery_workers()
+    return job_ids[0] if job_ids else None
+
+class OutboxOutcomeBuffer:
+    """Collects delivery outcomes for leased outbox jobs and records them with bulk_write in bounded batches"""
+
+    def __init__(self, owner, jobs, lease_seconds=300, flush_size=None):
+        self.owner = owner
+        self.jobs = {job['id']: job for job in jobs}
+        self.lease_seconds = lease_seconds
+        self.leased_at = time.monotonic()
+        self.flush_size = flush_size or int(os.environ.get('OUTBOX_FLUSH_SIZE', '200'))
+        self.backoff_base = int(os.environ.get('OUTBOX_BACKOFF_BASE', '30'))
+        self.backoff_max = int(os.environ.get('OUTBOX_BACKOFF_MAX', '3600'))
+        self._lock = threading.Lock()
+        self._results = []
+
+    def add(self, job_id, success, error=None):
+        with self._lock:
+            self._results.append((self.jobs[job_id], success, error))
+            if len(self._results) < self.flush_size:
+                return
+            results, self._results = self._results, []
+        self._record(results)
+
+    def flush(self):
+        with self._lock:
+            results, self._results = self._results, []
+        if results:
+            self._record(results)
+
+    def _record(self, results):
+        record_outbox_results(self.owner, results, self.backoff_base, self.backoff_max)
+        for job, success, _ in results:
+            if success:
+                outcome = 'sent'
+            elif job.get('attempts', 0) + 1 >= job.get('max_attempts', OUTBOX_MAX_ATTEMPTS):
+                outcome = 'dead'
+            else:
+                outcome = 'retry'
+            OUTBOX_JOBS.inc(kind=job['kind'], outcome=outcome)
+
+    def renew(self, job_ids):
+        renew_outbox_leases(self.owner, job_ids, self.lease_seconds)
+
+    def defer(self, job_ids, retry_after):
+        """Hand jobs back untouched to retry after retry_after seconds (not a failed attempt)"""
+        defer_outbox_jobs(self.owner, job_ids, datetime.now() + timedelta(seconds=retry_after))
+        for job_id in job_ids:
+            OUTBOX_JOBS.inc(kind=self.jobs[job_id]['kind'], outcome='deferred')
+
+def _deliver_reminders(jobs, outcomes):
+    from api.email_service import send_reminder_items
+
+    # Sender credentials are resolved now, so changes made after queueing apply
+    users = get_users_by_ids(job['payload']['user_id'] for job in jobs)
+    by_sender = {}
+    for job in jobs:
+        payload = job['payload']
+        user = users.get(payload['user_id'])
+        if not user or not user.get('email_credentials') or not user.get('app_password'):
+            outcomes.add(job['id'], False, 'sender email credentials not set')
+            continue
+        # The outcome is keyed by job id, so the job stands in for the reminder
+        reminder = {'id': job['id'], 'title': payload['title'], 'description': payload.get('description')}
+        item = (reminder, payload['recipient_email'], parse_reminder_time(payload['reminder_time']), user)
+        by_sender.setdefault(user['email_credentials'], []).append(item)
+
+    # Send only what each sender account's rate limit allows now; the rest waits
+    limiter = get_rate_limiter()
+    items = []
+    for sender_email, sender_items in by_sender.items():
+        granted, retry_after = limiter.acquire(sender_email, len(sender_items))
+        items.extend(sender_items[:granted])
+        if granted < len(sender_items):
+            deferred = [item[0]['id'] for item in sender_items[granted:]]
+            logger.info("⏳ Rate limit for %s: deferring %d reminders by %.0fs", sender_email, len(deferred), retry_after)
+            outcomes.defer(deferred, retry_after)
+    if items:
+        send_reminder_items(items, outcomes)
+
+def _deliver_password_reset(payload):
+    from api.auth import deliver_reset_email
+    return deliver_reset_email(payload['email'], payload['token'], payload.get('user_name', 'User'))
+
+def _deliver_credentials_verification(payload):
+    from api.auth import deliver_credentials_verification
+    return deliver_credentials_verification(payload['user_id'])
+
+# Handlers for single-message job kinds; each returns True when the email went out
+OUTBOX_HANDLERS = {
+    'password_reset': _deliver_password_reset,
+    'credentials_verification': _deliver_credentials_verification,
+}
+
+def deliver_outbox_jobs(jobs, owner, lease_seconds=300):
+    """Deliver a batch of leased jobs and record every outcome"""
+    outcomes = OutboxOutcomeBuffer(owner, jobs, lease_seconds)
+    try:
+        reminder_jobs = [job for job in jobs if job['kind'] == 'reminder']
+        if reminder_jobs:
+            _deliver_reminders(reminder_jobs, outcomes)
+        limiter = get_rate_limiter()
+        for job in jobs:
+            if job['kind'] == 'reminder':
+                continue
+            # Password reset and verification emails only count against the global limit
+            granted, retry_after = limiter.acquire(None)
+            if not granted:
+                outcomes.defer([job['id']], retry_after)
+                continue
+            handler = OUTBOX_HANDLERS.get(job['kind'])
+            if handler is None:
+                outcomes.add(job['id'], False, f"unknown job kind {job['kind']!r}")
+                continue
+            try:
+                success = bool(handler(job['payload']))
+                outcomes.add(job['id'], success, None if success else 'delivery failed')
+            except Exception as e:
+                logger.warning("❌ Outbox job %s (%s) failed: %s", job['id'], job['kind'], e)
+                outcomes.add(job['id'], False, e)
+    finally:
+        # Whatever was not recorded keeps its lease and is retried after it expires
+        outcomes.flush()
+
+def drain_outbox(max_jobs=None):
+    """Deliver ready outbox jobs until the queue is empty (or max_jobs were leased)"""
+    from api.email_service import get_worker_id
+    from api.smtp_pool import get_smtp_pool
+
+    owner = get_worker_id()
+    lease_seconds = int(os.environ.get('OUTBOX_LEASE_SECONDS', '300'))
+    batch_size = int(os.environ.get('OUTBOX_BATCH_SIZE', '500'))
+    delivered = 0
+    with OUTBOX_DRAIN_DURATION.time():
+        while max_jobs is None or delivered < max_jobs:
+            limit = batch_size if max_jobs is None else min(batch_size, max_jobs - delivered)
+            jobs = lease_outbox_jobs(owner, lease_seconds, limit)
+            if not jobs:
+                break
+            delivered += len(jobs)
+            deliver_outbox_jobs(jobs, owner, lease_seconds)
+    if delivered:
+        logger.info("📬 Outbox: processed %d jobs", delivered)
+        # Drop SMTP sessions that were not used recently
+        get_smtp_pool().close_idle()
+    return delivered
+
+def _queue_depth():
+    return {(status,): count_outbox_jobs(status) for status in (OUTBOX_PENDING, OUTBOX_DEAD)}
+
+# Read from MongoDB when /metrics is scraped
+OUTBOX_QUEUE_DEPTH.set_function(_queue_depth)
+
+_executor = None
+_wake_lock = threading.Lock()
+_drain_queued = False
+
+def wake_delivery_workers():
+    """Start an in-process drain in the background unless one is already waiting to run"""
+    global _executor, _drain_queued
+    with _wake_lock:
+        if _drain_queued:
+            return
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=int(os.environ.get('OUTBOX_WORKERS', '2')),
+                thread_name_prefix='outbox'
+            )
+        _drain_queued = True
+    _executor.submit(_background_drain)
+
+def _background_drain():
+    global _drain_queued
+    with _wake_lock:
+        # Jobs queued from here on need a new drain, so let the next wake submit one
+        _drain_queued = False
+    try:
+        drain_outbox()
+    except Exception as e:
+        logger.exception("❌ Outbox drain failed: %s", e)
+
+def _reset_after_fork():
+    # The executor's threads do not survive fork(); start a new one on the next wake
+    global _executor, _wake_lock, _drain_queued
+    _executor = None
+    _wake_lock = threading.Lock()
+    _drain_queued = False
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,68 @@
+import os
+import threading
+
+from api.mongo_handler import take_rate_tokens, return_rate_tokens
+
+class RateLimiter:
+    """Token buckets per sender account (per minute and per day) plus one global bucket
+
+    Bucket state lives in MongoDB, so every web process and worker draws
+    from the same budget. A limit of 0 disables that bucket.
+    """
+
+    def __init__(self, per_minute=20, per_day=500, global_per_minute=0):
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.global_per_minute = global_per_minute
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            per_minute=int(os.environ.get('RATE_LIMIT_PER_MINUTE', '20')),
+            per_day=int(os.environ.get('RATE_LIMIT_PER_DAY', '500')),
+            global_per_minute=int(os.environ.get('RATE_LIMIT_GLOBAL_PER_MINUTE', '0')),
+        )
+
+    def _buckets(self, account):
+        # (key, capacity, period in seconds)
+        buckets = []
+        if account and self.per_minute:
+            buckets.append((f"account:{account.lower()}:minute", self.per_minute, 60))
+        if account and self.per_day:
+            buckets.append((f"account:{account.lower()}:day", self.per_day, 86400))
+        if self.global_per_minute:
+            buckets.append(('global:minute', self.global_per_minute, 60))
+        return buckets
+
+    def acquire(self, account, count=1):
+        """Take up to `count` sends for account; returns (granted, retry_after_seconds)
+
+        Everything granted fits every bucket. retry_after says when the
+        rest is worth trying again (0 when all were granted).
+        """
+        granted = count
+        taken = []
+        retry_after = 0
+        for key, capacity, period in self._buckets(account):
+            got, _ = take_rate_tokens(key, capacity, capacity / period, granted)
+            taken.append((key, capacity, got))
+            if got < granted:
+                # Time for this bucket to refill the shortfall (at most one full period)
+                retry_after = max(retry_after, min(period, (count - got) * period / capacity))
+                granted = got
+        # Buckets consulted before the tightest one handed out more than can be used
+        for key, capacity, got in taken:
+            return_rate_tokens(key, capacity, got - granted)
+        return granted, (retry_after if granted < count else 0)
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def get_rate_limiter():
+    """Return the process-wide rate limiter, configured from the environment on first use"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter.from_env()
+    return _limiter
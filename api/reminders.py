@@ -1,27 +1,78 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, flash, Response
+import codecs
 import csv
 from flask_login import login_required, current_user
-from datetime import datetime
+from datetime import datetime, timedelta
 import io
+import logging
+import os
 import sys
+import zlib
 
 # Add project directory to path for imports when running as script
 sys.path.insert(0, 'py-project')
 
-from api.mongo_handler import add_reminder, get_reminders_by_user_id, get_reminder_by_id, update_reminder
+from api.mongo_handler import add_reminder, get_reminder_by_id, update_reminder, parse_reminder_time, upsert_reminders, iter_reminders_for_export, list_reminders_page, decode_page_cursor, get_reminder_stats
+from api.scheduler import notify_reminder_scheduled
 
 reminders_bp = Blueprint('reminders', __name__)
 
+logger = logging.getLogger(__name__)
+
+# Rows sent to MongoDB per bulk write during a CSV import
+IMPORT_BATCH_SIZE = int(os.environ.get('CSV_IMPORT_BATCH_SIZE', '1000'))
+# Rows written to the response per chunk during a CSV export
+EXPORT_CHUNK_ROWS = 500
+# Reminders per dashboard page
+DASHBOARD_PAGE_SIZE = int(os.environ.get('DASHBOARD_PAGE_SIZE', '50'))
+
+EXPORT_COLUMNS = ['id', 'user_id', 'title', 'description', 'reminder_time', 'created_at', 'is_completed', 'recipient_email']
+
 @reminders_bp.route('/dashboard')
 @login_required
 def dashboard():
-    # Get user's reminders with error handling
+    user_id = str(current_user.id)
+    # Filters stay in the query string so the next-page link keeps them
+    filters = {
+        'status': request.args.get('status', ''),
+        'start': request.args.get('start', ''),
+        'end': request.args.get('end', ''),
+        'q': request.args.get('q', '').strip(),
+    }
     try:
-        reminders = get_reminders_by_user_id(str(current_user.id))
+        start = _parse_date_arg(filters['start'])
+        end = _parse_date_arg(filters['end'])
+    except ValueError:
+        flash('Dates must be in YYYY-MM-DD format.')
+        start = end = None
+    if end is not None:
+        end += timedelta(days=1)
+    after = decode_page_cursor(request.args.get('after'))
+
+    # Get one page of the user's reminders with error handling
+    try:
+        reminders, next_cursor = list_reminders_page(
+            user_id,
+            after=after,
+            limit=DASHBOARD_PAGE_SIZE,
+            completed={'completed': True, 'pending': False}.get(filters['status']),
+            start=start,
+            end=end,
+            search=filters['q'] or None,
+        )
+        stats = get_reminder_stats(user_id)
     except Exception as e:
-        print(f"Error fetching reminders for user {current_user.id}: {e}")
-        reminders = []
-    return render_template('dashboard.html', reminders=reminders)
+        logger.warning("Error fetching reminders for user %s: %s", current_user.id, e)
+        reminders, next_cursor = [], None
+        stats = {'total': 0, 'pending': 0, 'completed': 0, 'deleted': 0, 'with_recipient': 0}
+    return render_template(
+        'dashboard.html',
+        reminders=reminders,
+        stats=stats,
+        filters=filters,
+        next_cursor=next_cursor,
+        is_first_page=after is None,
+    )
 
 @reminders_bp.route('/create_reminder', methods=['GET', 'POST'])
 @login_required
@@ -52,9 +103,10 @@ def create_reminder():
         try:
             # Create new reminder using MongoDB
             add_reminder(str(current_user.id), title, description, reminder_time, recipient_email)
+            notify_reminder_scheduled(reminder_time)
             flash('Reminder created successfully!')
         except Exception as e:
-            print(f"Error creating reminder for user {current_user.id}: {e}")
+            logger.warning("Error creating reminder for user %s: %s", current_user.id, e)
             flash('An error occurred while creating the reminder.')
 
         return redirect(url_for('reminders.dashboard'))
@@ -86,10 +138,11 @@ def edit_reminder(reminder_id):
         
         # Update reminder using CSV
         update_reminder(reminder_id, title, description, reminder_time, recipient_email, attachment)
+        notify_reminder_scheduled(reminder_time)
         flash('Reminder updated successfully!')
         return redirect(url_for('reminders.dashboard'))
     
-    reminder_time = datetime.strptime(reminder['reminder_time'], '%Y-%m-%d %H:%M:%S')
+    reminder_time = parse_reminder_time(reminder['reminder_time'])
     return render_template('edit_reminder.html', reminder=reminder, reminder_time=reminder_time)
 
 @reminders_bp.route('/delete_reminder/<reminder_id>')
@@ -108,24 +161,13 @@ def delete_reminder(reminder_id):
     flash('Reminder moved to recycle bin successfully!')
     return redirect(url_for('reminders.dashboard'))
 
-@reminders_bp.route('/export_reminders')
-@login_required
-def export_reminders():
+def _export_csv_chunks(cursor, user_id):
+    # Encode a few hundred rows at a time so memory stays flat however many reminders there are
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
     try:
-        # Convert current_user.id to string for consistency
-        user_id_str = str(current_user.id)
-        # Get user's reminders
-        reminders = get_reminders_by_user_id(user_id_str)
-        
-        # Create CSV data in memory
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow(['id', 'user_id', 'title', 'description', 'reminder_time', 'created_at', 'is_completed', 'recipient_email'])
-        
-        # Write data with validation and defaults
-        for reminder in reminders:
+        for count, reminder in enumerate(cursor, 1):
             writer.writerow([
                 reminder.get('id', ''),
                 reminder.get('user_id', ''),
@@ -136,18 +178,70 @@ def export_reminders():
                 'Yes' if str(reminder.get('is_completed', '')).lower() == 'true' else 'No',
                 reminder.get('recipient_email', '') or ''
             ])
-        
-        # Prepare file for download
-        output.seek(0)
-        
-        return send_file(
-            io.BytesIO(output.getvalue().encode('utf-8')),
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=f'reminders_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+            if count % EXPORT_CHUNK_ROWS == 0:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode('utf-8')
+    except Exception as e:
+        # Headers are already sent; re-raising aborts the chunked response, so the
+        # client sees a failed download instead of a truncated file that looks complete
+        logger.error("❌ Error streaming reminders export for user %s: %s", user_id, e)
+        raise
+    finally:
+        cursor.close()
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def _parse_date_arg(value):
+    return datetime.strptime(value, '%Y-%m-%d') if value else None
+
+@reminders_bp.route('/export_reminders')
+@login_required
+def export_reminders():
+    """Stream the user's reminders as CSV
+
+    Optional query parameters: start and end (YYYY-MM-DD, both inclusive),
+    status (completed or pending) and gzip=1 for a .csv.gz download.
+    """
+    try:
+        # Convert current_user.id to string for consistency
+        user_id_str = str(current_user.id)
+
+        try:
+            start = _parse_date_arg(request.args.get('start'))
+            end = _parse_date_arg(request.args.get('end'))
+        except ValueError:
+            flash('Export dates must be in YYYY-MM-DD format.')
+            return redirect(url_for('reminders.dashboard'))
+        if end is not None:
+            end += timedelta(days=1)
+        status = request.args.get('status')
+        completed = {'completed': True, 'pending': False}.get(status)
+
+        cursor = iter_reminders_for_export(user_id_str, start=start, end=end, completed=completed)
+        chunks = _export_csv_chunks(cursor, user_id_str)
+        filename = f'reminders_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+        mimetype = 'text/csv'
+        if request.args.get('gzip', '').lower() in ['1', 'true', 'yes']:
+            chunks = _gzip_chunks(chunks)
+            filename += '.gz'
+            mimetype = 'application/gzip'
+
+        # No Content-Length, so the body goes out with chunked transfer encoding as it is produced
+        return Response(
+            chunks,
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
         )
     except Exception as e:
-        print(f"Error exporting reminders for user {current_user.id}: {e}")
+        logger.warning("Error exporting reminders for user %s: %s", current_user.id, e)
         flash('An error occurred while exporting reminders.')
         return redirect(url_for('reminders.dashboard'))
 
@@ -168,18 +262,17 @@ def import_reminders():
             flash('Please upload a CSV file')
             return redirect(url_for('reminders.dashboard'))
 
+        user_id = str(current_user.id)
+        imported_count = 0
+        updated_count = 0
+        skipped_count = 0
+        earliest_time = None
+        now = datetime.now()
+        batch = []
         try:
-            # Read CSV file correctly
-            content = file.read().decode('utf-8')
-            stream = io.StringIO(content, newline=None)
-            csv_reader = csv.DictReader(stream)
-
-            imported_count = 0
-            updated_count = 0
-            skipped_count = 0
-
-            # Get existing reminders for the user to check for duplicates
-            user_reminders = get_reminders_by_user_id(str(current_user.id))
+            # Decode the upload line by line instead of loading it all into memory. The
+            # upload may be a SpooledTemporaryFile, which io.TextIOWrapper cannot wrap
+            csv_reader = csv.DictReader(codecs.iterdecode(file.stream, 'utf-8'))
 
             for row in csv_reader:
                 # Validate required fields like create_reminder does
@@ -187,68 +280,62 @@ def import_reminders():
                 reminder_time_str = row.get('reminder_time', '').strip()
 
                 if not title or not reminder_time_str:
-                    print(f"Skipping row - missing required fields: title='{title}', reminder_time='{reminder_time_str}'")
+                    logger.warning("Skipping row - missing required fields: title='%s', reminder_time='%s'", title, reminder_time_str, extra={'sampled': True})
                     skipped_count += 1
                     continue
 
                 try:
                     reminder_time = datetime.strptime(reminder_time_str, '%Y-%m-%d %H:%M:%S')
                 except ValueError:
-                    print(f"Skipping row - invalid date format '{reminder_time_str}'")
+                    logger.warning("Skipping row - invalid date format '%s'", reminder_time_str, extra={'sampled': True})
                     skipped_count += 1
                     continue
 
                 # Check if reminder time is in the future like create_reminder does
-                if reminder_time <= datetime.now():
-                    print(f"Skipping row - reminder time '{reminder_time}' is not in the future")
+                if reminder_time <= now:
+                    logger.warning("Skipping row - reminder time '%s' is not in the future", reminder_time, extra={'sampled': True})
                     skipped_count += 1
                     continue
 
-                # Check if reminder already exists (by title and time)
-                existing_reminder = None
-                for user_reminder in user_reminders:
-                    if (user_reminder['title'] == title and
-                        user_reminder['reminder_time'] == reminder_time.strftime('%Y-%m-%d %H:%M:%S')):
-                        existing_reminder = user_reminder
-                        break
-
                 description = row.get('description', '').strip()
                 recipient_email = row.get('recipient_email', '').strip() or None
-
-                if existing_reminder:
-                    # Update existing reminder
-                    print(f"Updating existing reminder: {title}")
-                    update_reminder(
-                        existing_reminder['id'],
-                        title,
-                        description,
-                        reminder_time,
-                        recipient_email
-                    )
-                    updated_count += 1
-                else:
-                    # Create new reminder
-                    print(f"Creating new reminder: {title}")
-                    add_reminder(
-                        str(current_user.id),
-                        title,
-                        description,
-                        reminder_time,
-                        recipient_email
-                    )
-                    imported_count += 1
-
+                if earliest_time is None or reminder_time < earliest_time:
+                    earliest_time = reminder_time
+
+                # An existing reminder with the same title and time is updated, otherwise one is created
+                batch.append((title, description, reminder_time, recipient_email))
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    inserted, updated = upsert_reminders(user_id, batch)
+                    imported_count += inserted
+                    updated_count += updated
+                    batch = []
+
+            if batch:
+                inserted, updated = upsert_reminders(user_id, batch)
+                imported_count += inserted
+                updated_count += updated
+
+            logger.info("📥 Imported reminders from CSV", extra={
+                'user_id': user_id, 'imported': imported_count, 'updated': updated_count, 'skipped': skipped_count
+            })
+            notify_reminder_scheduled(earliest_time)
             flash(f'Imported {imported_count} new reminders, updated {updated_count} existing reminders, skipped {skipped_count} due to errors.')
             return redirect(url_for('reminders.dashboard'))
 
         except UnicodeDecodeError as e:
-            print(f"Unicode decode error: {e}")
-            flash('Error reading CSV file. Please ensure it is encoded in UTF-8.')
-            return redirect(url_for('reminders.dashboard'))
+            logger.warning("Unicode decode error: %s", e)
+            error_message = 'Error reading CSV file. Please ensure it is encoded in UTF-8'
         except Exception as e:
-            print(f"Error importing reminders: {e}")
-            flash('An error occurred while importing reminders.')
-            return redirect(url_for('reminders.dashboard'))
+            logger.warning("Error importing reminders: %s", e)
+            error_message = 'An error occurred while importing reminders'
+        if imported_count or updated_count:
+            # Batches written before the error are saved; importing the file again updates them in place
+            notify_reminder_scheduled(earliest_time)
+            flash(f'{error_message}. {imported_count} new reminders were imported and {updated_count} existing '
+                  f'reminders updated before the error; importing the file again updates them instead of adding duplicates.')
+        else:
+            flash(f'{error_message}.')
+        return redirect(url_for('reminders.dashboard'))
 
     return render_template('import_reminders.html')
 
@@ -260,7 +347,7 @@ def delete_all_reminders():
         deleted_count = delete_all_reminders_by_user(str(current_user.id))
         flash(f'Successfully moved {deleted_count} reminders to recycle bin.')
     except Exception as e:
-        print(f"Error deleting all reminders for user {current_user.id}: {e}")
+        logger.warning("Error deleting all reminders for user %s: %s", current_user.id, e)
         flash('An error occurred while deleting reminders.')
     return redirect(url_for('reminders.dashboard'))
 
@@ -271,7 +358,7 @@ def recycle_bin():
         from api.mongo_handler import get_deleted_reminders_by_user
         deleted_reminders = get_deleted_reminders_by_user(str(current_user.id))
     except Exception as e:
-        print(f"Error fetching deleted reminders for user {current_user.id}: {e}")
+        logger.warning("Error fetching deleted reminders for user %s: %s", current_user.id, e)
         deleted_reminders = []
     return render_template('recycle_bin.html', deleted_reminders=deleted_reminders)
 
@@ -313,6 +400,6 @@ def empty_recycle_bin():
         deleted_count = permanently_delete_all_deleted_reminders(str(current_user.id))
         flash(f'Permanently deleted {deleted_count} reminders from recycle bin.')
     except Exception as e:
-        print(f"Error emptying recycle bin for user {current_user.id}: {e}")
+        logger.warning("Error emptying recycle bin for user %s: %s", current_user.id, e)
         flash('An error occurred while emptying recycle bin.')
     return redirect(url_for('reminders.recycle_bin'))
@@ -0,0 +1,155 @@
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+from api.email_service import check_and_send_reminders, dispatch_reminders
+from api.mongo_handler import get_next_reminder_time, refresh_upcoming_reminders, upcoming_reminders
+from api.outbox import drain_outbox
+from api.metrics import UPCOMING_REMINDERS
+
+logger = logging.getLogger(__name__)
+
+UPCOMING_REMINDERS.set_function(lambda: len(upcoming_reminders))
+
+class ReminderScheduler:
+    """Dispatches reminders at their due time from the in-memory upcoming-reminder heap
+
+    A full MongoDB sweep still runs at startup and every few minutes as a
+    safety net for reminders created by other processes and leases held by
+    workers that died.
+    """
+
+    def __init__(self, app, scheduler, safety_poll_minutes=5):
+        self.app = app
+        self.scheduler = scheduler
+        self.safety_poll_minutes = safety_poll_minutes
+        self.next_wake = None
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+
+    def start(self):
+        self.scheduler.add_job(
+            func=self.run_sweep,
+            trigger=IntervalTrigger(minutes=self.safety_poll_minutes),
+            id='check_reminders',
+            name='Check and send due reminders (safety poll)',
+            replace_existing=True,
+            max_instances=2
+        )
+        # Sweep once at startup; it loads the upcoming window and schedules the first wake-up
+        self._wake_at(datetime.now(), self.run_sweep)
+
+    def run_sweep(self):
+        """Full sweep against MongoDB, then rebuild the upcoming-reminder window"""
+        # Safety poll and precise wake-ups may overlap; run one sweep at a time
+        with self._sweep_lock:
+            with self._lock:
+                self.next_wake = None
+            try:
+                check_and_send_reminders(self.app)
+                # Catch reminders other processes created since the last rebuild
+                upcoming_reminders.reset()
+            finally:
+                self.schedule_next()
+
+    def run_dispatch(self):
+        """Send whatever the upcoming-reminder heap says is due, without searching MongoDB"""
+        with self._sweep_lock:
+            with self._lock:
+                self.next_wake = None
+            try:
+                refresh_upcoming_reminders()
+                due_ids = upcoming_reminders.pop_due(datetime.now())
+                if due_ids:
+                    dispatch_reminders(self.app, due_ids)
+            finally:
+                self.schedule_next()
+
+    def schedule_next(self):
+        try:
+            refresh_upcoming_reminders()
+            next_time = upcoming_reminders.peek_time()
+            if next_time is None:
+                # Nothing inside the lookahead window; look further out
+                next_time = get_next_reminder_time()
+        except Exception as e:
+            logger.error("❌ Failed to look up next reminder time: %s", e)
+            return
+        if next_time is None:
+            logger.debug("💤 No pending reminders - next safety poll in %d minutes", self.safety_poll_minutes)
+            return
+        self.notify(next_time)
+
+    def notify(self, reminder_time):
+        """Wake up at reminder_time if that is sooner than the currently planned wake-up"""
+        # Compare and reschedule under one lock so concurrent notifies keep the earliest time
+        with self._lock:
+            if self.next_wake is not None and self.next_wake <= reminder_time:
+                return
+            self._schedule_wake(reminder_time)
+
+    def _wake_at(self, when, func=None):
+        with self._lock:
+            self._schedule_wake(when, func)
+
+    def _schedule_wake(self, when, func=None):
+        # Caller holds self._lock. Never schedule in the past; APScheduler would drop a stale date trigger
+        when = max(when, datetime.now() + timedelta(milliseconds=100))
+        self.next_wake = when
+        self.scheduler.add_job(
+            func=func or self.run_dispatch,
+            trigger=DateTrigger(run_date=when),
+            id='next_due_reminder',
+            name='Send reminders at their due time',
+            replace_existing=True,
+            misfire_grace_time=None,
+            max_instances=2
+        )
+        logger.debug("⏰ Next reminder check scheduled for %s", when)
+
+_reminder_scheduler = None
+
+def start_reminder_scheduler(app, scheduler):
+    """Register the reminder sweep on an APScheduler instance according to REMINDER_SCHEDULER_MODE"""
+    global _reminder_scheduler
+    mode = os.environ.get('REMINDER_SCHEDULER_MODE', 'precise').lower()
+    if mode == 'interval':
+        scheduler.add_job(
+            func=check_and_send_reminders,
+            args=[app],
+            trigger=IntervalTrigger(minutes=int(os.environ.get('REMINDER_POLL_MINUTES', '5'))),
+            id='check_reminders',
+            name='Check and send due reminders',
+            replace_existing=True
+        )
+        return None
+
+    safety_poll_minutes = int(os.environ.get('REMINDER_SAFETY_POLL_MINUTES', '5'))
+    _reminder_scheduler = ReminderScheduler(app, scheduler, safety_poll_minutes)
+    _reminder_scheduler.start()
+    return _reminder_scheduler
+
+def start_outbox_poller(scheduler):
+    """Drain the email outbox on an interval so retries and jobs queued elsewhere go out"""
+    scheduler.add_job(
+        func=drain_outbox,
+        trigger=IntervalTrigger(seconds=int(os.environ.get('OUTBOX_POLL_SECONDS', '30'))),
+        id='drain_outbox',
+        name='Deliver queued emails',
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+
+def notify_reminder_scheduled(reminder_time):
+    """Tell the in-process scheduler about a new or moved reminder (no-op without one)"""
+    if _reminder_scheduler is None or reminder_time is None:
+        return
+    try:
+        _reminder_scheduler.notify(reminder_time)
+    except Exception as e:
+        logger.warning("⚠️ Failed to reschedule reminder check: %s", e)
@@ -0,0 +1,163 @@
+import http.client
+import json
+import logging
+import os
+import threading
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+class SendGridTransport:
+    """Posts SendGrid v3 mail/send requests over kept-alive HTTPS connections
+
+    Idle connections are pooled and shared by all callers (and API keys), so
+    a burst of emails pays the TLS handshake once instead of per message.
+    """
+
+    # SendGrid accepts at most 1000 personalizations per request
+    MAX_PERSONALIZATIONS = 1000
+
+    def __init__(self, base_url='https://api.sendgrid.com', timeout=30, max_idle=10):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or 'https'
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path.rstrip('/') + '/v3/mail/send'
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        self._idle = []
+        self.stats = {'connects': 0, 'requests': 0, 'reuses': 0}
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            base_url=os.environ.get('SENDGRID_API_BASE', 'https://api.sendgrid.com'),
+            timeout=float(os.environ.get('SENDGRID_TIMEOUT', '30')),
+            max_idle=int(os.environ.get('SENDGRID_POOL_SIZE', '10')),
+        )
+
+    def _checkout(self):
+        with self._lock:
+            if self._idle:
+                self.stats['reuses'] += 1
+                return self._idle.pop(), True
+            self.stats['connects'] += 1
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout), False
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout), False
+
+    def _checkin(self, conn):
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def post(self, api_key, payload):
+        """POST one mail/send body; returns (status, response body)"""
+        body = json.dumps(payload).encode('utf-8')
+        headers = {
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json',
+            'Connection': 'keep-alive',
+        }
+        while True:
+            conn, reused = self._checkout()
+            try:
+                conn.request('POST', self.path, body, headers)
+                response = conn.getresponse()
+                data = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                # The server dropped an idle keep-alive connection; retry once on a fresh one
+                if reused:
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+            with self._lock:
+                self.stats['requests'] += 1
+            if response.will_close:
+                conn.close()
+            else:
+                self._checkin(conn)
+            return response.status, data
+
+    def _send(self, api_key, payload):
+        try:
+            status, data = self.post(api_key, payload)
+        except Exception as e:
+            logger.warning("❌ SendGrid request failed: %s", e)
+            return False, e
+        if status != 202:
+            logger.warning("❌ SendGrid error: %s - %r", status, data[:200])
+            return False, f"SendGrid status {status}"
+        return True, None
+
+    def send_mail(self, api_key, from_email, to_email, subject, text, reply_to=None, html=None):
+        """Send one email (text, plus HTML when given); returns (success, error)"""
+        content = [{'type': 'text/plain', 'value': text}]
+        if html:
+            content.append({'type': 'text/html', 'value': html})
+        payload = {
+            'personalizations': [{'to': [{'email': to_email}]}],
+            'from': {'email': from_email},
+            'subject': subject,
+            'content': content,
+        }
+        if reply_to:
+            payload['reply_to'] = {'email': reply_to}
+        return self._send(api_key, payload)
+
+    def send_personalized(self, api_key, from_email, subject, text, recipients, reply_to=None):
+        """Send one template to many recipients, packing up to 1000 per API call
+
+        subject and text may contain substitution tags; recipients is a list of
+        (to_email, {tag: value}). Returns one (success, error) per recipient.
+        """
+        results = []
+        for start in range(0, len(recipients), self.MAX_PERSONALIZATIONS):
+            chunk = recipients[start:start + self.MAX_PERSONALIZATIONS]
+            payload = {
+                'personalizations': [
+                    {'to': [{'email': to_email}], 'substitutions': substitutions}
+                    for to_email, substitutions in chunk
+                ],
+                'from': {'email': from_email},
+                'subject': subject,
+                'content': [{'type': 'text/plain', 'value': text}],
+            }
+            if reply_to:
+                payload['reply_to'] = {'email': reply_to}
+            # SendGrid accepts or rejects the whole request
+            results.extend([self._send(api_key, payload)] * len(chunk))
+        return results
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+_transport = None
+_transport_lock = threading.Lock()
+
+def get_sendgrid_transport():
+    """Return the process-wide SendGrid transport, configured from the environment on first use"""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = SendGridTransport.from_env()
+    return _transport
+
+def _reset_after_fork():
+    # Kept-alive connections are shared with the parent; the child drops them unclosed
+    global _transport, _transport_lock
+    _transport = None
+    _transport_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
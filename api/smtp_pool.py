@@ -0,0 +1,214 @@
+import hashlib
+import os
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+
+from api.metrics import SMTP_CONNECT_SECONDS, SMTP_LOGIN_SECONDS, SMTP_SEND_SECONDS, SMTP_ERRORS
+
+# Errors that reject a single message but leave the session usable
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+class SMTPConnectionPool:
+    """Keeps authenticated SMTP sessions alive per (server, port, sender account, password)"""
+
+    def __init__(self, max_per_account=2, idle_timeout=60, check_after=5, timeout=30, use_tls=True):
+        self.max_per_account = max_per_account
+        self.idle_timeout = idle_timeout
+        self.check_after = check_after
+        self.timeout = timeout
+        self.use_tls = use_tls
+        self._lock = threading.Condition()
+        self._idle = {}   # key -> list of (server, last_used)
+        self._open = {}   # key -> number of open sessions, idle or in use
+        self.stats = {'connects': 0, 'logins': 0, 'reuses': 0, 'discarded': 0}
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_per_account=int(os.environ.get('SMTP_POOL_MAX_PER_ACCOUNT', '2')),
+            idle_timeout=float(os.environ.get('SMTP_POOL_IDLE_TIMEOUT', '60')),
+            timeout=float(os.environ.get('SMTP_TIMEOUT', '30')),
+            use_tls=os.environ.get('SMTP_USE_TLS', 'true').lower() in ['true', '1', 't'],
+        )
+
+    @staticmethod
+    def _key(smtp_server, smtp_port, username, password):
+        # The password digest keeps a session logged in with an old app password
+        # from being reused (and reporting success) after the credentials change
+        digest = hashlib.sha256((password or '').encode('utf-8')).hexdigest()
+        return (smtp_server, smtp_port, username, digest)
+
+    def _connect(self, key, password):
+        smtp_server, smtp_port, username, _ = key
+        stage = 'connect'
+        start = time.perf_counter()
+        server = None
+        try:
+            server = smtplib.SMTP(smtp_server, smtp_port, timeout=self.timeout)
+            if self.use_tls:
+                server.starttls()
+            SMTP_CONNECT_SECONDS.observe(time.perf_counter() - start, backend='threaded')
+            stage = 'login'
+            start = time.perf_counter()
+            server.login(username, password)
+            SMTP_LOGIN_SECONDS.observe(time.perf_counter() - start, backend='threaded')
+        except Exception:
+            SMTP_ERRORS.inc(backend='threaded', stage=stage)
+            if server is not None:
+                self._close(server)
+            raise
+        with self._lock:
+            self.stats['connects'] += 1
+            self.stats['logins'] += 1
+        return server
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _is_alive(server):
+        try:
+            return server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _release_slot(self, key):
+        with self._lock:
+            self._open[key] -= 1
+            if not self._open[key]:
+                del self._open[key]
+            self._lock.notify_all()
+
+    def _acquire(self, key):
+        """Reserve a session slot; returns an idle session or None if a new one must be opened"""
+        with self._lock:
+            while True:
+                idle = self._idle.get(key)
+                if idle:
+                    server, last_used = idle.pop()
+                    return server, last_used
+                if self._open.get(key, 0) < self.max_per_account:
+                    self._open[key] = self._open.get(key, 0) + 1
+                    return None, None
+                self._lock.wait()
+
+    def checkout(self, smtp_server, smtp_port, username, password):
+        key = self._key(smtp_server, smtp_port, username, password)
+        self.close_idle()
+        server, last_used = self._acquire(key)
+        if server is not None:
+            # Probe sessions that sat idle for a while; replace dead ones
+            if time.monotonic() - last_used < self.check_after or self._is_alive(server):
+                with self._lock:
+                    self.stats['reuses'] += 1
+                return key, server
+            self._close(server)
+            with self._lock:
+                self.stats['discarded'] += 1
+        try:
+            return key, self._connect(key, password)
+        except Exception:
+            self._release_slot(key)
+            raise
+
+    def checkin(self, key, server, discard=False):
+        if discard:
+            self._close(server)
+            with self._lock:
+                self.stats['discarded'] += 1
+            self._release_slot(key)
+            return
+        with self._lock:
+            self._idle.setdefault(key, []).append((server, time.monotonic()))
+            self._lock.notify_all()
+
+    @contextmanager
+    def connection(self, smtp_server, smtp_port, username, password):
+        """Borrow an authenticated session; it is dropped if the caller raises"""
+        key, server = self.checkout(smtp_server, smtp_port, username, password)
+        try:
+            yield server
+        except MESSAGE_ERRORS:
+            # Rejected message; smtplib already reset the session, so keep it
+            self.checkin(key, server)
+            raise
+        except Exception:
+            self.checkin(key, server, discard=True)
+            raise
+        self.checkin(key, server)
+
+    def sendmail(self, smtp_server, smtp_port, username, password, from_addr, to_addrs, msg):
+        """Send one message over a pooled session, retrying once on a dropped connection"""
+        try:
+            with self.connection(smtp_server, smtp_port, username, password) as server:
+                return timed_sendmail(server, from_addr, to_addrs, msg)
+        except smtplib.SMTPServerDisconnected:
+            with self.connection(smtp_server, smtp_port, username, password) as server:
+                return timed_sendmail(server, from_addr, to_addrs, msg)
+
+    def close_idle(self, max_idle=None):
+        """Close sessions idle for longer than max_idle seconds (idle_timeout by default)"""
+        max_idle = self.idle_timeout if max_idle is None else max_idle
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            for key, idle in list(self._idle.items()):
+                keep = []
+                for server, last_used in idle:
+                    if now - last_used >= max_idle:
+                        expired.append((key, server))
+                    else:
+                        keep.append((server, last_used))
+                if keep:
+                    self._idle[key] = keep
+                else:
+                    del self._idle[key]
+        for key, server in expired:
+            self._close(server)
+            self._release_slot(key)
+        return len(expired)
+
+    def close_all(self):
+        return self.close_idle(max_idle=0)
+
+def timed_sendmail(server, from_addr, to_addrs, msg):
+    """server.sendmail, recorded in the SMTP send latency and error metrics"""
+    start = time.perf_counter()
+    try:
+        result = server.sendmail(from_addr, to_addrs, msg)
+    except Exception:
+        SMTP_ERRORS.inc(backend='threaded', stage='send')
+        raise
+    SMTP_SEND_SECONDS.observe(time.perf_counter() - start, backend='threaded')
+    return result
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_smtp_pool():
+    """Return the process-wide SMTP pool, configured from the environment on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SMTPConnectionPool.from_env()
+    return _pool
+
+def _reset_after_fork():
+    # Pooled sessions are sockets shared with the parent; the child drops them
+    # without QUIT (that would end the parent's sessions) and opens its own
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,223 @@
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from api.smtp_pool import get_smtp_pool, timed_sendmail
+from api.sendgrid_transport import get_sendgrid_transport
+
+class EmailDeliveryError(Exception):
+    pass
+
+class EmailMessage:
+    """An email with a text body and an optional HTML alternative, independent of how it will be delivered"""
+
+    def __init__(self, sender, recipient, subject, text, reply_to=None, html=None):
+        self.sender = sender
+        self.recipient = recipient
+        self.subject = subject
+        self.text = text
+        self.reply_to = reply_to
+        self.html = html
+
+    def _headers(self):
+        headers = [('From', self.sender), ('To', self.recipient), ('Subject', self.subject)]
+        if self.reply_to:
+            headers.append(('Reply-To', self.reply_to))
+        return headers
+
+    def as_string(self):
+        """Serialize as MIME for SMTP and file sinks; single-part unless there is an HTML body"""
+        headers = self._headers()
+        if self.html is None and _is_simple_ascii(headers, self.text):
+            # Plain 7-bit text needs no encoding, so skip the email package's generator
+            lines = ['Content-Type: text/plain; charset="us-ascii"', 'MIME-Version: 1.0',
+                     'Content-Transfer-Encoding: 7bit']
+            lines.extend(f"{name}: {value}" for name, value in headers)
+            return '\n'.join(lines) + '\n\n' + self.text
+        if self.html is None:
+            msg = MIMEText(self.text, 'plain', _charset(self.text))
+        else:
+            msg = MIMEMultipart('alternative')
+            msg.attach(MIMEText(self.text, 'plain', _charset(self.text)))
+            msg.attach(MIMEText(self.html, 'html', _charset(self.html)))
+        for name, value in headers:
+            msg[name] = value
+        return msg.as_string()
+
+def _charset(text):
+    # us-ascii parts go out as 7bit; anything else is base64-encoded utf-8
+    return 'us-ascii' if text.isascii() else 'utf-8'
+
+def _is_simple_ascii(headers, text):
+    for _, value in headers:
+        if not value.isascii() or '\n' in value or '\r' in value or len(value) > 900:
+            return False
+    if not text.isascii() or '\r' in text:
+        return False
+    # SMTP caps lines at 998 characters
+    return len(text) <= 998 or max(map(len, text.split('\n'))) <= 998
+
+# Every transport has send(message, credentials=None) and raises on failure.
+# credentials is the (username, password) pair of the sending SMTP account.
+
+class SMTPTransport:
+    name = 'smtp'
+
+    def __init__(self, smtp_server=None, smtp_port=None, pool=None):
+        self.smtp_server = smtp_server or os.environ.get('SMTP_SERVER', 'smtp.gmail.com')
+        self.smtp_port = smtp_port or int(os.environ.get('SMTP_PORT', '587'))
+        self.pool = pool
+
+    @staticmethod
+    def _check_credentials(credentials):
+        if not credentials or not credentials[0] or not credentials[1]:
+            raise EmailDeliveryError("SMTP delivery needs sender credentials")
+        return credentials
+
+    def send(self, message, credentials=None):
+        username, password = self._check_credentials(credentials)
+        (self.pool or get_smtp_pool()).sendmail(
+            self.smtp_server, self.smtp_port, username, password,
+            message.sender, message.recipient, message.as_string()
+        )
+
+    @contextmanager
+    def session(self, credentials):
+        """Borrow one pooled session for several messages; yields send(message)
+
+        Unlike send(), a dropped connection is not retried; the session is
+        discarded and the error reaches the caller.
+        """
+        username, password = self._check_credentials(credentials)
+        with (self.pool or get_smtp_pool()).connection(self.smtp_server, self.smtp_port, username, password) as server:
+            yield lambda message: timed_sendmail(server, message.sender, message.recipient, message.as_string())
+
+class SendGridMailTransport:
+    name = 'sendgrid'
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+
+    def send(self, message, credentials=None):
+        if not self.api_key:
+            raise EmailDeliveryError("SendGrid delivery needs an API key")
+        sent, error = get_sendgrid_transport().send_mail(
+            self.api_key, message.sender, message.recipient, message.subject, message.text, message.reply_to,
+            html=message.html
+        )
+        if not sent:
+            raise EmailDeliveryError(str(error))
+
+class ConsoleTransport:
+    """Prints emails instead of sending them (local development)"""
+    name = 'console'
+
+    def send(self, message, credentials=None):
+        print(f"📧 Email for {message.recipient} (from {message.sender}):")
+        print(f"Subject: {message.subject}")
+        print(f"Body:\n{message.text}")
+
+class FileTransport:
+    """Writes every email as an .eml file into a directory"""
+    name = 'file'
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._count = 0
+
+    def send(self, message, credentials=None):
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            self._count += 1
+            count = self._count
+        filename = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{os.getpid()}-{count}.eml"
+        with open(os.path.join(self.directory, filename), 'w', encoding='utf-8') as f:
+            f.write(message.as_string())
+
+class MemoryTransport:
+    """Keeps sent emails in a list, for scripts and manual checks"""
+    name = 'memory'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.messages = []
+
+    def send(self, message, credentials=None):
+        with self._lock:
+            self.messages.append(message)
+
+    def clear(self):
+        with self._lock:
+            self.messages = []
+
+class NullTransport:
+    """Accepts and drops every email; for load tests"""
+    name = 'null'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sent = 0
+
+    def send(self, message, credentials=None):
+        with self._lock:
+            self.sent += 1
+
+# Transports that never leave the process; reminder batches use them message by message
+SINK_TRANSPORTS = ('console', 'file', 'memory', 'null')
+
+_sinks = {}
+_sinks_lock = threading.Lock()
+
+def configured_transport():
+    """EMAIL_TRANSPORT: 'auto' (default), 'smtp', 'sendgrid', 'console', 'file', 'memory' or 'null'"""
+    return os.environ.get('EMAIL_TRANSPORT', 'auto').lower()
+
+def get_sink_transport(name=None):
+    """Return the process-wide sink transport for name (default: EMAIL_TRANSPORT), or None"""
+    name = name or configured_transport()
+    if name not in SINK_TRANSPORTS:
+        return None
+    with _sinks_lock:
+        if name not in _sinks:
+            if name == 'console':
+                _sinks[name] = ConsoleTransport()
+            elif name == 'file':
+                _sinks[name] = FileTransport(os.environ.get('EMAIL_FILE_DIR', 'sent_emails'))
+            elif name == 'memory':
+                _sinks[name] = MemoryTransport()
+            else:
+                _sinks[name] = NullTransport()
+        return _sinks[name]
+
+def get_transport(credentials=None, sendgrid_api_key=None):
+    """Pick the transport for one email
+
+    With EMAIL_TRANSPORT=auto, SendGrid is used when a key is given, then SMTP
+    when the sender has credentials, and the console otherwise.
+    """
+    name = configured_transport()
+    if name == 'auto':
+        if sendgrid_api_key:
+            name = 'sendgrid'
+        elif credentials and credentials[1]:
+            name = 'smtp'
+        else:
+            name = 'console'
+    if name == 'smtp':
+        return SMTPTransport()
+    if name == 'sendgrid':
+        return SendGridMailTransport(sendgrid_api_key or os.environ.get('SENDGRID_API_KEY'))
+    transport = get_sink_transport(name)
+    if transport is None:
+        raise EmailDeliveryError(f"Unknown EMAIL_TRANSPORT {name!r}")
+    return transport
+
+def send_email(message, credentials=None, sendgrid_api_key=None):
+    """Deliver one email through the selected transport; returns the transport name, raises on failure"""
+    transport = get_transport(credentials, sendgrid_api_key)
+    transport.send(message, credentials)
+    return transport.name
@@ -0,0 +1,95 @@
+import heapq
+import threading
+from datetime import timedelta
+
+class UpcomingReminders:
+    """In-memory min-heap of pending reminders due before a moving horizon
+
+    The heap is complete up to `horizon`: every pending reminder due by then
+    is in it, so dispatch can pop due ids without querying MongoDB. Only
+    reminders inside the lookahead window are held, which bounds memory.
+    Nothing is tracked until the first refresh() loads the window.
+    """
+
+    def __init__(self, window_seconds=900):
+        self.window = timedelta(seconds=window_seconds)
+        self.horizon = None
+        self._lock = threading.Lock()
+        self._heap = []      # (reminder_time, reminder_id), may hold stale entries
+        self._entries = {}   # reminder_id -> (reminder_time, user_id)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def refresh(self, now, loader):
+        """Extend the horizon to now + window; loader(after, until) yields (id, user_id, reminder_time)"""
+        new_horizon = now + self.window
+        # Hold the lock while loading so concurrent upserts cannot fall between horizons
+        with self._lock:
+            previous = self.horizon
+            if previous is not None and new_horizon <= previous:
+                return 0
+            # Only the slice past the old horizon is new
+            rows = list(loader(previous, new_horizon))
+            for reminder_id, user_id, reminder_time in rows:
+                self._push(reminder_id, user_id, reminder_time)
+            self.horizon = new_horizon
+        return len(rows)
+
+    def reset(self):
+        """Forget everything; the next refresh() rebuilds the whole window"""
+        with self._lock:
+            self.horizon = None
+            self._heap = []
+            self._entries = {}
+
+    def _push(self, reminder_id, user_id, reminder_time):
+        self._entries[reminder_id] = (reminder_time, user_id)
+        heapq.heappush(self._heap, (reminder_time, reminder_id))
+
+    def upsert(self, reminder_id, user_id, reminder_time):
+        with self._lock:
+            if self.horizon is None:
+                return
+            if reminder_time <= self.horizon:
+                self._push(reminder_id, user_id, reminder_time)
+            else:
+                self._entries.pop(reminder_id, None)
+
+    def remove(self, reminder_id):
+        with self._lock:
+            self._entries.pop(reminder_id, None)
+
+    def remove_user(self, user_id):
+        with self._lock:
+            for reminder_id, (_, owner) in list(self._entries.items()):
+                if owner == user_id:
+                    del self._entries[reminder_id]
+
+    def _drop_stale(self):
+        # Heap entries are invalidated lazily when a reminder moves or goes away
+        while self._heap:
+            reminder_time, reminder_id = self._heap[0]
+            entry = self._entries.get(reminder_id)
+            if entry is not None and entry[0] == reminder_time:
+                return
+            heapq.heappop(self._heap)
+
+    def peek_time(self):
+        """Earliest tracked reminder_time, or None"""
+        with self._lock:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        """Remove and return the ids of every tracked reminder due by now"""
+        due = []
+        with self._lock:
+            while True:
+                self._drop_stale()
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                _, reminder_id = heapq.heappop(self._heap)
+                del self._entries[reminder_id]
+                due.append(reminder_id)
+        return due
@@ -0,0 +1,65 @@
+import threading
+import time
+from collections import OrderedDict
+
+class UserCache:
+    """Per-process LRU cache of user documents with a time-to-live
+
+    Writers in this process invalidate entries as they change a user; the
+    TTL bounds how long a change made by another process can go unseen.
+    """
+
+    def __init__(self, max_size=10000, ttl_seconds=30):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # user_id -> (expires_at, user document)
+        # Bumped by every invalidation so a read that raced one is not cached
+        self._generation = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def get(self, user_id):
+        """Return a copy of the cached user, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+        return dict(user)
+
+    def put(self, user_id, user, generation=None):
+        """Cache a user read from the database; skipped if anything was invalidated since `generation`"""
+        if self.max_size <= 0 or self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[user_id] = (time.monotonic() + self.ttl_seconds, dict(user))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def reset_after_fork(self):
+        """Give a forked child a fresh lock (another thread may have held it) and an empty cache"""
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generation += 1
+
+    def invalidate(self, user_id=None):
+        """Forget one user, or everyone when user_id is None"""
+        with self._lock:
+            self._generation += 1
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
@@ -0,0 +1,73 @@
+"""Convert legacy string reminder_time values to native datetimes in place.
+
+Safe to run while the app is serving: every update is conditional on the
+document still holding the exact string that was read, so a concurrent edit
+is never overwritten. Re-running resumes where a previous run stopped, since
+converted reminders no longer match the string filter.
+
+Usage: python scripts/backfill_reminder_times.py [--batch-size N] [--dry-run]
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+# Add project directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from api.mongo_handler import reminders_collection, REMINDER_TIME_FORMAT
+
+def backfill_reminder_times(batch_size=1000, dry_run=False):
+    query = {'reminder_time': {'$type': 'string'}}
+    remaining = reminders_collection.count_documents(query)
+    print(f"Found {remaining} reminders with string reminder_time")
+
+    converted = 0
+    invalid = 0
+    last_id = None
+    while True:
+        # Walk in _id order so unparseable values are not picked up again
+        batch_query = dict(query)
+        if last_id is not None:
+            batch_query['_id'] = {'$gt': last_id}
+        batch = list(
+            reminders_collection.find(batch_query, {'_id': 1, 'reminder_time': 1})
+            .sort('_id', 1)
+            .limit(batch_size)
+        )
+        if not batch:
+            break
+        last_id = batch[-1]['_id']
+
+        operations = []
+        for doc in batch:
+            try:
+                value = datetime.strptime(doc['reminder_time'], REMINDER_TIME_FORMAT)
+            except ValueError:
+                print(f"Warning: Invalid reminder_time format for {doc['_id']}: {doc['reminder_time']}")
+                invalid += 1
+                continue
+            operations.append(UpdateOne(
+                {'_id': doc['_id'], 'reminder_time': doc['reminder_time']},
+                {'$set': {'reminder_time': value}}
+            ))
+
+        if operations and not dry_run:
+            result = reminders_collection.bulk_write(operations, ordered=False)
+            converted += result.modified_count
+        else:
+            converted += len(operations)
+
+        print(f"Progress: {converted + invalid}/{remaining} processed ({converted} converted, {invalid} invalid)")
+
+    print(f"Backfill completed: {converted} converted, {invalid} left unchanged")
+    return converted
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill reminder_time strings to datetimes")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+    backfill_reminder_times(args.batch_size, args.dry_run)
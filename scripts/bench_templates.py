@@ -0,0 +1,71 @@
+"""Measure how fast reminder emails are rendered and serialized.
+
+Compares the registry templates (single-part, compiled once) with the
+previous per-call f-string + MIMEMultipart assembly. No network or
+database is used.
+
+Usage: python scripts/bench_templates.py [--messages 100000] [--html]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+# Add project directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from api.email_service import build_reminder_message
+from api.email_templates import render_email
+
+def legacy_reminder_message(sender_email, receiver_email, reminder_title, reminder_description, reminder_time):
+    """The reminder message as it was built before the template registry"""
+    msg = MIMEMultipart()
+    msg['From'] = sender_email
+    msg['To'] = receiver_email
+    msg['Subject'] = f"Reminder: {reminder_title}"
+
+    body = f"""
+        Hello!
+
+        This is a reminder for: {reminder_title}
+
+        Description: {reminder_description or 'No description provided'}
+
+        Scheduled Time: {reminder_time.strftime('%Y-%m-%d %H:%M')}
+
+        ---
+        This is an automated reminder from the Reminder App.
+        """
+    msg.attach(MIMEText(body, 'plain'))
+    return msg.as_string()
+
+def html_reminder_message(sender_email, receiver_email, reminder_title, reminder_description, reminder_time):
+    return render_email(
+        'reminder', sender_email, receiver_email, include_html=True,
+        title=reminder_title,
+        description=reminder_description or 'No description provided',
+        scheduled_time=reminder_time.strftime('%Y-%m-%d %H:%M'),
+    ).as_string()
+
+def bench(build, messages):
+    reminder_time = datetime.now()
+    start = time.perf_counter()
+    for i in range(messages):
+        build('sender@example.com', f'user{i}@example.com', f'Reminder {i}', 'Benchmark description', reminder_time)
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark reminder email rendering")
+    parser.add_argument('--messages', type=int, default=100000)
+    parser.add_argument('--html', action='store_true', help="also measure text + HTML multipart messages")
+    args = parser.parse_args()
+
+    builders = [('legacy', legacy_reminder_message), ('template', build_reminder_message)]
+    if args.html:
+        builders.append(('template+html', html_reminder_message))
+    for name, build in builders:
+        elapsed = bench(build, args.messages)
+        print(f"{name:>13}: {args.messages} messages in {elapsed:.2f}s ({args.messages / elapsed:.0f} msg/s)")
@@ -0,0 +1,48 @@
+"""Create the declared MongoDB indexes and check that hot queries use them.
+
+Index creation is idempotent, so this is safe to run on every deploy. With
+--check, every query in mongo_handler.hot_queries() is explained and the
+script exits non-zero if any of them would scan a whole collection.
+
+Usage: python scripts/ensure_indexes.py [--check] [--skip-create]
+"""
+import argparse
+import os
+import sys
+
+# Add project directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# Load environment variables from .env file if it exists
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass  # python-dotenv not installed, skip loading .env
+
+from api.mongo_handler import INDEXES, ensure_indexes, find_collection_scans
+
+def main(check=False, create=True):
+    ok = True
+    if create:
+        failed = ensure_indexes()
+        for name, error in failed:
+            print(f"❌ Failed to create index {name}: {error}")
+        print(f"✅ {len(INDEXES) - len(failed)} of {len(INDEXES)} indexes in place")
+        ok = not failed
+
+    if check:
+        scans = find_collection_scans()
+        for name, stages in scans:
+            print(f"❌ {name} does a collection scan: {' <- '.join(stages)}")
+        if not scans:
+            print("✅ No hot query does a collection scan")
+        ok = ok and not scans
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create MongoDB indexes and check hot query plans")
+    parser.add_argument('--check', action='store_true', help="explain hot queries and fail on COLLSCAN")
+    parser.add_argument('--skip-create', action='store_true', help="only run the check")
+    args = parser.parse_args()
+    sys.exit(0 if main(check=args.check, create=not args.skip_create) else 1)
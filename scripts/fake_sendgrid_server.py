@@ -0,0 +1,106 @@
+"""Minimal local stand-in for the SendGrid v3 mail/send API.
+
+Counts TCP connections, API requests and personalizations (one per recipient)
+and answers 202 with keep-alive. Point the app at it with
+SENDGRID_API_BASE=http://127.0.0.1:8025 and any API key.
+
+Usage: python scripts/fake_sendgrid_server.py [--port 8025] [--delay SECONDS] [--status 202]
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class SendGridCounters:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        self.personalizations = 0
+        self.request_sizes = []  # personalizations in each accepted request
+
+    def incr(self, name, amount=1):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def record_request(self, personalizations):
+        with self.lock:
+            self.requests += 1
+            self.personalizations += personalizations
+            self.request_sizes.append(personalizations)
+
+    def snapshot(self):
+        with self.lock:
+            return {'connections': self.connections, 'requests': self.requests,
+                    'personalizations': self.personalizations}
+
+class _SendGridHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.counters.incr('connections')
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output readable
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', '0')))
+        if self.server.delay:
+            # Simulate the provider's round-trip latency
+            time.sleep(self.server.delay)
+        status = self.server.status
+        if self.path != '/v3/mail/send' or not self.headers.get('Authorization', '').startswith('Bearer '):
+            status = 401
+        else:
+            try:
+                payload = json.loads(body)
+                self.server.counters.record_request(len(payload.get('personalizations', [])))
+            except ValueError:
+                status = 400
+        response = b'' if status == 202 else json.dumps({'errors': [{'message': 'rejected by stub'}]}).encode()
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+class FakeSendGridServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 512
+
+    def __init__(self, host='127.0.0.1', port=0, delay=0.0, status=202):
+        super().__init__((host, port), _SendGridHandler)
+        self.counters = SendGridCounters()
+        self.delay = delay
+        self.status = status
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        """Serve from a daemon thread and return self (handy for benchmarks)"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local fake SendGrid API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--delay', type=float, default=0.0, help="seconds to wait before every response")
+    parser.add_argument('--status', type=int, default=202, help="status code to answer mail/send with")
+    args = parser.parse_args()
+    server = FakeSendGridServer(args.host, args.port, args.delay, args.status)
+    print(f"Fake SendGrid API listening on http://{args.host}:{server.port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Counters: {server.counters.snapshot()}")
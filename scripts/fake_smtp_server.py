@@ -0,0 +1,120 @@
+"""Minimal local SMTP sink that counts connections, EHLO handshakes, logins and messages.
+
+Point the app at it with SMTP_SERVER=127.0.0.1 SMTP_PORT=2525 SMTP_USE_TLS=false
+to check how many handshakes a sweep performs without touching a real provider.
+
+Usage: python scripts/fake_smtp_server.py [--port 2525] [--delay SECONDS]
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+class SMTPCounters:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.ehlos = 0
+        self.logins = 0
+        self.messages = 0
+
+    def incr(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'connections': self.connections,
+                'ehlos': self.ehlos,
+                'logins': self.logins,
+                'messages': self.messages,
+            }
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        if self.server.delay:
+            # Simulate a provider's round-trip latency
+            time.sleep(self.server.delay)
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        counters = self.server.counters
+        counters.incr('connections')
+        self.reply('220 fake-smtp ready')
+        in_data = False
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            line = raw.decode('utf-8', 'replace').rstrip('\r\n')
+            if in_data:
+                if line == '.':
+                    in_data = False
+                    counters.incr('messages')
+                    self.reply('250 OK: queued')
+                continue
+            command = line.split(' ', 1)[0].upper()
+            if command == 'EHLO':
+                counters.incr('ehlos')
+                self.reply('250-fake-smtp\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME')
+            elif command == 'HELO':
+                self.reply('250 fake-smtp')
+            elif command == 'AUTH':
+                parts = line.split()
+                if len(parts) > 1 and parts[1].upper() == 'LOGIN':
+                    # Username and password prompts
+                    self.reply('334 VXNlcm5hbWU6')
+                    self.rfile.readline()
+                    self.reply('334 UGFzc3dvcmQ6')
+                    self.rfile.readline()
+                elif len(parts) < 3:
+                    self.reply('334 ')
+                    self.rfile.readline()
+                counters.incr('logins')
+                self.reply('235 Authentication successful')
+            elif command == 'DATA':
+                in_data = True
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            elif command in ('MAIL', 'RCPT', 'RSET', 'NOOP'):
+                self.reply('250 OK')
+            else:
+                self.reply('502 Command not implemented')
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    # Benchmarks open hundreds of sessions at once
+    request_queue_size = 512
+
+    def __init__(self, host='127.0.0.1', port=0, delay=0.0):
+        super().__init__((host, port), _SMTPHandler)
+        self.counters = SMTPCounters()
+        self.delay = delay
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        """Serve from a daemon thread and return self (handy for benchmarks)"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local fake SMTP server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=2525)
+    parser.add_argument('--delay', type=float, default=0.0, help="seconds to wait before every reply")
+    args = parser.parse_args()
+    server = FakeSMTPServer(args.host, args.port, args.delay)
+    print(f"Fake SMTP server listening on {args.host}:{server.port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Counters: {server.counters.snapshot()}")
@@ -0,0 +1,45 @@
+"""Deliver queued emails from the MongoDB outbox in a standalone process.
+
+Jobs are leased before delivery, so several workers (and the web app's own
+background drain) can run side by side. Failed jobs are retried with
+exponential backoff and parked as 'dead' after OUTBOX_MAX_ATTEMPTS.
+
+Usage: python scripts/run_delivery_worker.py [--interval SECONDS] [--once]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+# Add project directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
+except ImportError:
+    pass  # python-dotenv not installed, skip loading .env
+
+from api.outbox import drain_outbox
+from api.logging_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+def run_worker(interval=5, once=False):
+    while True:
+        try:
+            drain_outbox()
+        except Exception as e:
+            logger.exception("❌ Outbox drain failed: %s", e)
+        if once:
+            return
+        time.sleep(interval)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deliver queued outbox emails in a loop")
+    parser.add_argument('--interval', type=float, default=5)
+    parser.add_argument('--once', action='store_true')
+    args = parser.parse_args()
+    configure_logging()
+    run_worker(args.interval, args.once)
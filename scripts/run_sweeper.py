@@ -0,0 +1,49 @@
+"""Run the reminder sweep in a standalone process.
+
+Reminders are leased atomically in MongoDB, so any number of these processes
+(plus the web app's own scheduler and the Vercel cron) can sweep side by side
+without sending a reminder twice.
+
+Usage: python scripts/run_sweeper.py [--interval SECONDS] [--once]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+from flask import Flask
+
+# Add project directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
+except ImportError:
+    pass  # python-dotenv not installed, skip loading .env
+
+from api.email_service import check_and_send_reminders
+from api.logging_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+def run_sweeper(interval=60, once=False):
+    # The sweep only needs an application context, not the full web app
+    app = Flask(__name__)
+    while True:
+        try:
+            check_and_send_reminders(app)
+        except Exception as e:
+            logger.exception("❌ Reminder sweep failed: %s", e)
+        if once:
+            return
+        time.sleep(interval)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the reminder sweep in a loop")
+    parser.add_argument('--interval', type=float, default=60)
+    parser.add_argument('--once', action='store_true')
+    args = parser.parse_args()
+    configure_logging()
+    run_sweeper(args.interval, args.once)
@@ -0,0 +1,38 @@
+"""Dashboard page cursors round-trip both reminder_time representations.
+
+Run with: python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from api.mongo_handler import decode_page_cursor, encode_page_cursor
+
+class PageCursorTest(unittest.TestCase):
+    def test_datetime_reminder_time_round_trips(self):
+        reminder = {'id': '0b6f5c3e-8d1a-4c2e-9f4b-2a7d6e1c9b80', 'reminder_time': datetime(2024, 5, 1, 9, 30, 15, 250)}
+
+        self.assertEqual(decode_page_cursor(encode_page_cursor(reminder)), (reminder['reminder_time'], '0b6f5c3e-8d1a-4c2e-9f4b-2a7d6e1c9b80'))
+
+    def test_legacy_string_reminder_time_round_trips(self):
+        reminder = {'id': 'r1', 'reminder_time': '2024-05-01 09:30:00'}
+
+        self.assertEqual(decode_page_cursor(encode_page_cursor(reminder)), ('2024-05-01 09:30:00', 'r1'))
+
+    def test_the_two_representations_stay_distinct(self):
+        native = encode_page_cursor({'id': 'r1', 'reminder_time': datetime(2024, 5, 1, 9, 30)})
+        legacy = encode_page_cursor({'id': 'r1', 'reminder_time': '2024-05-01T09:30:00'})
+
+        self.assertIsInstance(decode_page_cursor(native)[0], datetime)
+        self.assertIsInstance(decode_page_cursor(legacy)[0], str)
+
+    def test_garbage_decodes_to_none(self):
+        for token in [None, '', 'x', 'no-separator', 'q2024-05-01|r1', 'dnot-a-date|r1', '|']:
+            with self.subTest(token=token):
+                self.assertIsNone(decode_page_cursor(token))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+"""RateLimiter.acquire against in-memory token buckets (take/return_rate_tokens stubbed).
+
+Run with: python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import api.rate_limiter as rate_limiter
+from api.rate_limiter import RateLimiter
+
+MINUTE = 'account:sender@example.com:minute'
+DAY = 'account:sender@example.com:day'
+GLOBAL = 'global:minute'
+
+class Buckets:
+    """Tokens left per bucket key; unknown buckets start full"""
+
+    def __init__(self, **tokens):
+        self.tokens = tokens
+        self.returned = {}
+
+    def take(self, key, capacity, per_second, requested):
+        left = self.tokens.get(key, capacity)
+        granted = min(requested, left)
+        self.tokens[key] = left - granted
+        return granted, self.tokens[key]
+
+    def give_back(self, key, capacity, count):
+        if count:
+            self.returned[key] = self.returned.get(key, 0) + count
+            self.tokens[key] = min(capacity, self.tokens[key] + count)
+
+class RateLimiterTest(unittest.TestCase):
+    def acquire(self, buckets, count, **limits):
+        limiter = RateLimiter(**limits)
+        with mock.patch.object(rate_limiter, 'take_rate_tokens', buckets.take), \
+                mock.patch.object(rate_limiter, 'return_rate_tokens', buckets.give_back):
+            return limiter.acquire('Sender@Example.com', count)
+
+    def test_everything_granted_when_buckets_have_room(self):
+        buckets = Buckets()
+
+        self.assertEqual(self.acquire(buckets, 5, per_minute=20, per_day=500), (5, 0))
+        self.assertEqual(buckets.tokens, {MINUTE: 15, DAY: 495})
+        self.assertEqual(buckets.returned, {})
+
+    def test_minute_bucket_limits_the_grant(self):
+        buckets = Buckets(**{MINUTE: 3})
+
+        granted, retry_after = self.acquire(buckets, 5, per_minute=20, per_day=500)
+
+        self.assertEqual(granted, 3)
+        # 2 missing tokens at 20 per minute
+        self.assertAlmostEqual(retry_after, 6)
+        # The day bucket was only asked for what the minute bucket allowed
+        self.assertEqual(buckets.tokens, {MINUTE: 0, DAY: 497})
+        self.assertEqual(buckets.returned, {})
+
+    def test_day_bucket_shortfall_returns_tokens_to_the_minute_bucket(self):
+        buckets = Buckets(**{DAY: 2})
+
+        granted, retry_after = self.acquire(buckets, 5, per_minute=20, per_day=500)
+
+        self.assertEqual(granted, 2)
+        self.assertEqual(buckets.returned, {MINUTE: 3})
+        self.assertEqual(buckets.tokens, {MINUTE: 18, DAY: 0})
+        # 3 missing tokens at 500 per day
+        self.assertAlmostEqual(retry_after, 3 * 86400 / 500)
+
+    def test_empty_global_bucket_returns_everything(self):
+        buckets = Buckets(**{GLOBAL: 0})
+
+        granted, retry_after = self.acquire(buckets, 4, per_minute=20, per_day=500, global_per_minute=100)
+
+        self.assertEqual(granted, 0)
+        self.assertEqual(buckets.returned, {MINUTE: 4, DAY: 4})
+        self.assertEqual(buckets.tokens, {MINUTE: 20, DAY: 500, GLOBAL: 0})
+        self.assertAlmostEqual(retry_after, 4 * 60 / 100)
+
+    def test_retry_after_is_capped_at_one_period(self):
+        buckets = Buckets(**{MINUTE: 0})
+
+        granted, retry_after = self.acquire(buckets, 50, per_minute=20, per_day=0)
+
+        self.assertEqual((granted, retry_after), (0, 60))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+"""SendGrid sends should share one kept-alive connection and pack 1000 recipients per request.
+
+Runs scripts/fake_sendgrid_server.py on localhost; no network or database is used.
+Run with: python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+from fake_sendgrid_server import FakeSendGridServer
+
+from api.sendgrid_transport import SendGridTransport
+
+class SendGridKeepAliveTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeSendGridServer().start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.transport = SendGridTransport(base_url=self.server.base_url)
+        self.addCleanup(self.transport.close)
+
+    def test_personalized_send_is_split_into_chunks_of_1000(self):
+        recipients = [(f'user{i}@example.com', {'-title-': f'Reminder {i}'}) for i in range(2505)]
+
+        results = self.transport.send_personalized('key', 'sender@example.com', 'Reminder: -title-', 'Body', recipients)
+
+        self.assertEqual(results, [(True, None)] * 2505)
+        counters = self.server.counters
+        self.assertEqual(counters.request_sizes, [1000, 1000, 505])
+        self.assertEqual(counters.personalizations, 2505)
+        self.assertEqual(counters.connections, 1)
+
+    def test_single_sends_reuse_one_connection(self):
+        for i in range(5):
+            sent, error = self.transport.send_mail('key', 'sender@example.com', f'user{i}@example.com', 'Hi', 'Body')
+            self.assertTrue(sent, error)
+
+        counters = self.server.counters.snapshot()
+        self.assertEqual(counters['requests'], 5)
+        self.assertEqual(counters['connections'], 1)
+        self.assertEqual(self.transport.stats['reuses'], 4)
+
+    def test_rejected_request_fails_every_recipient_in_it(self):
+        self.server.status = 400
+        recipients = [(f'user{i}@example.com', {}) for i in range(3)]
+
+        results = self.transport.send_personalized('key', 'sender@example.com', 'Subject', 'Body', recipients)
+
+        self.assertEqual([sent for sent, _ in results], [False] * 3)
+
+if __name__ == '__main__':
+    unittest.main()
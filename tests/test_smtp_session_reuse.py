@@ -0,0 +1,113 @@
+"""One SMTP handshake should carry a whole batch of reminder emails.
+
+Runs scripts/fake_smtp_server.py on localhost; no network or database is used.
+Run with: python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+from fake_smtp_server import FakeSMTPServer
+
+import api.smtp_pool as smtp_pool
+from api.transports import get_sink_transport
+from api.email_service import send_reminder_batch
+
+class RecordingOutcomes:
+    """Collects send outcomes in place of the outbox outcome buffer"""
+    leased_at = None
+    lease_seconds = 300
+
+    def __init__(self):
+        self.results = []
+
+    def add(self, job_id, success, error=None):
+        self.results.append((job_id, success, error))
+
+class SMTPSessionReuseTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeSMTPServer().start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.env = {
+            'SMTP_SERVER': '127.0.0.1',
+            'SMTP_PORT': str(self.server.port),
+            'SMTP_USE_TLS': 'false',
+            'EMAIL_TRANSPORT': 'smtp',
+        }
+        self.saved_env = {name: os.environ.get(name) for name in self.env}
+        os.environ.update(self.env)
+        self.addCleanup(self.restore_env)
+        # A fresh pool so sessions from other tests are not reused
+        smtp_pool._pool = smtp_pool.SMTPConnectionPool.from_env()
+        self.addCleanup(self.close_pool)
+
+    def restore_env(self):
+        for name, value in self.saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    def close_pool(self):
+        smtp_pool._pool.close_all()
+        smtp_pool._pool = None
+
+    def reminder_batch(self, size):
+        user = {'email': 'owner@example.com', 'email_credentials': 'sender@example.com', 'app_password': 'secret'}
+        return [
+            ({'id': f'r{i}', 'title': f'Reminder {i}', 'description': 'Test'}, f'user{i}@example.com', datetime.now(), user)
+            for i in range(size)
+        ]
+
+    def test_batch_of_reminders_uses_one_handshake(self):
+        batch = self.reminder_batch(25)
+        outcomes = RecordingOutcomes()
+
+        send_reminder_batch(batch, outcomes)
+
+        self.assertEqual([success for _, success, _ in outcomes.results], [True] * 25)
+        counters = self.server.counters.snapshot()
+        self.assertEqual(counters['messages'], 25)
+        self.assertEqual(counters['connections'], 1)
+        self.assertEqual(counters['ehlos'], 1)
+        self.assertEqual(counters['logins'], 1)
+
+    def test_sink_transport_keeps_the_batch_off_smtp(self):
+        os.environ['EMAIL_TRANSPORT'] = 'memory'
+        sink = get_sink_transport()
+        sink.clear()
+        outcomes = RecordingOutcomes()
+
+        send_reminder_batch(self.reminder_batch(5), outcomes)
+
+        self.assertEqual(len(sink.messages), 5)
+        self.assertEqual([success for _, success, _ in outcomes.results], [True] * 5)
+        self.assertEqual(self.server.counters.snapshot()['connections'], 0)
+
+    def test_pooled_sendmail_reuses_the_session(self):
+        pool = smtp_pool.get_smtp_pool()
+        for i in range(10):
+            pool.sendmail('127.0.0.1', self.server.port, 'sender@example.com', 'secret',
+                          'sender@example.com', f'user{i}@example.com', 'Subject: hi\r\n\r\nbody')
+
+        counters = self.server.counters.snapshot()
+        self.assertEqual(counters['messages'], 10)
+        self.assertEqual(counters['ehlos'], 1)
+        self.assertEqual(counters['logins'], 1)
+
+    def test_changed_password_logs_in_again(self):
+        pool = smtp_pool.get_smtp_pool()
+        for password in ['old-secret', 'new-secret']:
+            pool.sendmail('127.0.0.1', self.server.port, 'sender@example.com', password,
+                          'sender@example.com', 'user@example.com', 'Subject: hi\r\n\r\nbody')
+
+        self.assertEqual(self.server.counters.snapshot()['logins'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""UpcomingReminders decides when a reminder fires; these tests need no database.
+
+Run with: python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from api.upcoming import UpcomingReminders
+
+NOW = datetime(2024, 1, 1, 12, 0, 0)
+
+def at(minutes):
+    return NOW + timedelta(minutes=minutes)
+
+class Loader:
+    """Stands in for the MongoDB query: returns rows due in (after, until] and records each call"""
+
+    def __init__(self, rows):
+        self.rows = rows  # (reminder_id, user_id, reminder_time)
+        self.calls = []
+
+    def __call__(self, after, until):
+        self.calls.append((after, until))
+        return [row for row in self.rows if (after is None or row[2] > after) and row[2] <= until]
+
+class UpcomingRemindersTest(unittest.TestCase):
+    def setUp(self):
+        self.upcoming = UpcomingReminders(window_seconds=600)
+
+    def test_nothing_is_tracked_before_the_first_refresh(self):
+        self.upcoming.upsert('r1', 'u1', at(1))
+
+        self.assertEqual(len(self.upcoming), 0)
+        self.assertIsNone(self.upcoming.peek_time())
+
+    def test_refresh_loads_the_window_then_only_the_new_slice(self):
+        loader = Loader([('r1', 'u1', at(5)), ('r2', 'u1', at(15)), ('r3', 'u2', at(30))])
+
+        self.assertEqual(self.upcoming.refresh(NOW, loader), 1)
+        self.assertEqual(self.upcoming.refresh(at(10), loader), 1)
+        # The horizon did not move, so nothing is queried
+        self.assertEqual(self.upcoming.refresh(at(5), loader), 0)
+
+        self.assertEqual(loader.calls, [(None, at(10)), (at(10), at(20))])
+        self.assertEqual(len(self.upcoming), 2)
+
+    def test_pop_due_returns_due_ids_in_time_order(self):
+        self.upcoming.refresh(NOW, Loader([]))
+        self.upcoming.upsert('late', 'u1', at(3))
+        self.upcoming.upsert('early', 'u1', at(1))
+        self.upcoming.upsert('later', 'u2', at(8))
+
+        self.assertEqual(self.upcoming.peek_time(), at(1))
+        self.assertEqual(self.upcoming.pop_due(at(5)), ['early', 'late'])
+        self.assertEqual(self.upcoming.pop_due(at(5)), [])
+        self.assertEqual(self.upcoming.peek_time(), at(8))
+        self.assertEqual(len(self.upcoming), 1)
+
+    def test_upsert_moves_a_reminder(self):
+        self.upcoming.refresh(NOW, Loader([('r1', 'u1', at(1))]))
+        self.upcoming.upsert('r1', 'u1', at(4))
+
+        self.assertEqual(self.upcoming.pop_due(at(2)), [])
+        self.assertEqual(self.upcoming.pop_due(at(4)), ['r1'])
+
+    def test_upsert_past_the_horizon_stops_tracking(self):
+        self.upcoming.refresh(NOW, Loader([('r1', 'u1', at(1))]))
+        self.upcoming.upsert('r1', 'u1', at(60))
+
+        self.assertEqual(len(self.upcoming), 0)
+        self.assertIsNone(self.upcoming.peek_time())
+
+    def test_remove_and_remove_user(self):
+        self.upcoming.refresh(NOW, Loader([('r1', 'u1', at(1)), ('r2', 'u1', at(2)), ('r3', 'u2', at(3))]))
+
+        self.upcoming.remove('r1')
+        self.assertEqual(self.upcoming.peek_time(), at(2))
+        self.upcoming.remove_user('u1')
+
+        self.assertEqual(self.upcoming.pop_due(at(10)), ['r3'])
+
+    def test_reset_forgets_everything_until_the_next_refresh(self):
+        loader = Loader([('r1', 'u1', at(1))])
+        self.upcoming.refresh(NOW, loader)
+
+        self.upcoming.reset()
+        self.assertIsNone(self.upcoming.horizon)
+        self.assertEqual(len(self.upcoming), 0)
+        self.assertEqual(self.upcoming.pop_due(at(10)), [])
+
+        self.upcoming.refresh(NOW, loader)
+        self.assertEqual(loader.calls[-1], (None, at(10)))
+        self.assertEqual(self.upcoming.pop_due(at(10)), ['r1'])
+
+if __name__ == '__main__':
+    unittest.main()